@@ -2,46 +2,62 @@
 """
 Process a batch of important HMRC URLs from comprehensive discovery
 """
-import json
-from rag.document_loader import HMRCDocumentLoader
-
-# Load the comprehensive URL discovery
-with open('data/discovered_urls_20250701_081652.json', 'r') as f:
-    discovery_data = json.load(f)
+from itertools import chain
+from pathlib import Path
 
-# Get URLs by depth - prioritize level 0 and 1 (most important sections)
-level_0_urls = discovery_data['urls_by_depth']['0']  # Main index
-level_1_urls = discovery_data['urls_by_depth']['1']  # Major sections
-
-# Create a priority list of important URLs (first 100 most important)
-priority_urls = level_0_urls + level_1_urls[:50]  # Main + 50 most important sections
+try:
+    from orjson import loads as json_loads
+except ImportError:  # Optional: stdlib json also parses bytes
+    from json import loads as json_loads
 
-print(f"📋 Processing {len(priority_urls)} priority HMRC URLs")
-print(f"   • Level 0 (main): {len(level_0_urls)}")
-print(f"   • Level 1 (sections): {min(50, len(level_1_urls))}")
+from rag.document_loader import HMRCDocumentLoader
 
-# Initialize document loader
-loader = HMRCDocumentLoader(max_pages=len(priority_urls))
 
-try:
-    # Load documents using priority URL list (skip discovery)
-    documents = loader.load_documents(discover_links=False, url_list=priority_urls)
+def main():
+    """Process the priority batch and save its chunks."""
+    # Load the comprehensive URL discovery
+    discovery_data = json_loads(Path('data/discovered_urls_20250701_081652.json').read_bytes())
     
-    if documents:
-        # Split into chunks
-        chunks = loader.split_documents(documents)
-        
-        # Save processed documents
-        saved_path = loader.save_documents(chunks, "hmrc_priority_batch")
+    # Get URLs by depth - prioritize level 0 and 1 (most important sections)
+    level_0_urls = discovery_data['urls_by_depth']['0']  # Main index
+    level_1_urls = discovery_data['urls_by_depth']['1']  # Major sections
+    
+    # Create a priority list of important URLs (first 100 most important)
+    # dict.fromkeys drops cross-level duplicates while keeping priority order
+    priority_urls = list(dict.fromkeys(level_0_urls + level_1_urls[:50]))  # Main + 50 most important sections
+    
+    print(f"📋 Processing {len(priority_urls)} priority HMRC URLs")
+    print(f"   • Level 0 (main): {len(level_0_urls)}")
+    print(f"   • Level 1 (sections): {min(50, len(level_1_urls))}")
+    
+    # Initialize document loader
+    loader = HMRCDocumentLoader(max_pages=len(priority_urls))
+    
+    try:
+        # Stream pages from the priority URL list through the splitter to disk (skip discovery);
+        # only one fetch window of pages is held in memory at a time
+        documents = loader.iter_documents(discover_links=False, url_list=priority_urls)
+        chunks = loader.iter_chunks(documents)
         
-        print(f"\n🎉 Batch processing complete!")
-        print(f"📊 Results:")
-        print(f"   • URLs processed: {len(priority_urls)}")
-        print(f"   • Documents loaded: {len(documents)}")
-        print(f"   • Chunks created: {len(chunks)}")
-        print(f"💾 Saved to: {saved_path}")
-    else:
-        print("❌ No documents loaded")
+        # Only save when something was loaded, so a failed run can't replace an earlier batch
+        # with empty Parquet and summary files
+        first_chunk = next(chunks, None)
+        if first_chunk is not None:
+            # Save processed documents
+            saved_path = loader.save_documents(chain([first_chunk], chunks), "hmrc_priority_batch")
+            
+            print(f"\n🎉 Batch processing complete!")
+            print(f"📊 Results:")
+            print(f"   • URLs processed: {len(priority_urls)}")
+            print(f"   • Documents loaded: {loader.documents_loaded}")
+            print(f"   • Chunks created: {loader.chunks_created}")
+            print(f"💾 Saved to: {saved_path}")
+        else:
+            print("❌ No documents loaded")
+    
+    except Exception as e:
+        print(f"❌ Error during batch processing: {str(e)}")
+
 
-except Exception as e:
-    print(f"❌ Error during batch processing: {str(e)}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -2,57 +2,74 @@
 """
 Process a comprehensive batch of HMRC URLs (Level 0 + Level 1 + top Level 2)
 """
-import json
-from rag.document_loader import HMRCDocumentLoader
-
-# Load the comprehensive URL discovery
-with open('data/discovered_urls_20250701_081652.json', 'r') as f:
-    discovery_data = json.load(f)
+from itertools import chain
+from pathlib import Path
 
-# Get URLs by depth - include more comprehensive coverage
-level_0_urls = discovery_data['urls_by_depth']['0']  # Main index (1)
-level_1_urls = discovery_data['urls_by_depth']['1']  # Major sections (25) 
-level_2_urls = discovery_data['urls_by_depth']['2']  # Detailed sections (up to 150)
-
-# Create comprehensive priority list (200 total URLs)
-comprehensive_urls = level_0_urls + level_1_urls + level_2_urls[:150]
+try:
+    from orjson import loads as json_loads
+except ImportError:  # Optional: stdlib json also parses bytes
+    from json import loads as json_loads
 
-print(f"📋 Processing {len(comprehensive_urls)} comprehensive HMRC URLs")
-print(f"   • Level 0 (main): {len(level_0_urls)}")
-print(f"   • Level 1 (sections): {len(level_1_urls)}")
-print(f"   • Level 2 (detailed): {min(150, len(level_2_urls))}")
-print(f"   • Total URLs: {len(comprehensive_urls)}")
+from rag.document_loader import HMRCDocumentLoader
 
-# Initialize document loader
-loader = HMRCDocumentLoader(max_pages=len(comprehensive_urls))
 
-try:
-    # Load documents using comprehensive URL list (skip discovery)
-    documents = loader.load_documents(discover_links=False, url_list=comprehensive_urls)
+def main():
+    """Process the comprehensive batch and save its chunks."""
+    # Load the comprehensive URL discovery
+    discovery_data = json_loads(Path('data/discovered_urls_20250701_081652.json').read_bytes())
     
-    if documents:
-        # Split into chunks
-        chunks = loader.split_documents(documents)
-        
-        # Save processed documents
-        saved_path = loader.save_documents(chunks, "hmrc_comprehensive_batch")
-        
-        print(f"\n🎉 Comprehensive batch processing complete!")
-        print(f"📊 Results:")
-        print(f"   • URLs processed: {len(comprehensive_urls)}")
-        print(f"   • Documents loaded: {len(documents)}")
-        print(f"   • Chunks created: {len(chunks)}")
-        print(f"💾 Saved to: {saved_path}")
-        
-        # Create properly named version for setup script
-        import shutil
-        timestamp = saved_path.split('_')[-1].split('.')[0]
-        proper_name = f"data/hmrc_docs_comprehensive_{timestamp}.pkl"
-        shutil.copy(saved_path, proper_name)
-        print(f"📋 Also saved as: {proper_name}")
+    # Get URLs by depth - include more comprehensive coverage
+    level_0_urls = discovery_data['urls_by_depth']['0']  # Main index (1)
+    level_1_urls = discovery_data['urls_by_depth']['1']  # Major sections (25) 
+    level_2_urls = discovery_data['urls_by_depth']['2']  # Detailed sections (up to 150)
+    
+    # Create comprehensive priority list (200 total URLs)
+    # dict.fromkeys drops cross-level duplicates while keeping priority order
+    comprehensive_urls = list(dict.fromkeys(level_0_urls + level_1_urls + level_2_urls[:150]))
+    
+    print(f"📋 Processing {len(comprehensive_urls)} comprehensive HMRC URLs")
+    print(f"   • Level 0 (main): {len(level_0_urls)}")
+    print(f"   • Level 1 (sections): {len(level_1_urls)}")
+    print(f"   • Level 2 (detailed): {min(150, len(level_2_urls))}")
+    print(f"   • Total URLs: {len(comprehensive_urls)}")
+    
+    # Initialize document loader
+    loader = HMRCDocumentLoader(max_pages=len(comprehensive_urls))
+    
+    try:
+        # Stream pages from the comprehensive URL list through the splitter to disk (skip discovery);
+        # only one fetch window of pages is held in memory at a time
+        documents = loader.iter_documents(discover_links=False, url_list=comprehensive_urls)
+        chunks = loader.iter_chunks(documents)
         
-    else:
-        print("❌ No documents loaded")
+        # Only save when something was loaded, so a failed run can't replace an earlier batch
+        # with empty Parquet and summary files
+        first_chunk = next(chunks, None)
+        if first_chunk is not None:
+            # Save processed documents
+            saved_path = loader.save_documents(chain([first_chunk], chunks), "hmrc_comprehensive_batch")
+            
+            print(f"\n🎉 Comprehensive batch processing complete!")
+            print(f"📊 Results:")
+            print(f"   • URLs processed: {len(comprehensive_urls)}")
+            print(f"   • Documents loaded: {loader.documents_loaded}")
+            print(f"   • Chunks created: {loader.chunks_created}")
+            print(f"💾 Saved to: {saved_path}")
+            
+            # Create properly named version for setup script
+            import shutil
+            saved = Path(saved_path)
+            timestamp = saved.stem.split('_')[-1]
+            proper_name = f"data/hmrc_docs_comprehensive_{timestamp}{saved.suffix}"
+            shutil.copy(saved_path, proper_name)
+            print(f"📋 Also saved as: {proper_name}")
+            
+        else:
+            print("❌ No documents loaded")
+    
+    except Exception as e:
+        print(f"❌ Error during comprehensive batch processing: {str(e)}")
+
 
-except Exception as e:
-    print(f"❌ Error during comprehensive batch processing: {str(e)}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -3,22 +3,420 @@ import json
 import pickle
 import re
 import time
-from typing import List, Dict, Any, Set
-from datetime import datetime
+import gzip
+import hashlib
+import tempfile
+import asyncio
+import threading
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Set, Tuple, Optional, Union, Iterable, Iterator, NamedTuple
+from collections import defaultdict, Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from urllib.parse import urljoin, urlparse
 
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import aiohttp
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the stdlib encoder
+    orjson = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: documents are then stored as pickle only
+    pa = pq = None
+if pa is not None:
+    # Saved chunk layout: the text plus every metadata field this loader produces
+    _PARQUET_SCHEMA = pa.schema([
+        ('content', pa.string()),
+        ('source', pa.string()),
+        ('title', pa.string()),
+        ('description', pa.string()),
+        ('language', pa.string()),
+        ('source_url', pa.string()),
+        ('loaded_at', pa.string()),
+        ('document_type', pa.string()),
+        ('section', pa.string()),
+        ('discovery_depth', pa.int64()),
+        ('page_title', pa.string()),
+        ('chunk_id', pa.int64()),
+        ('chunk_size', pa.int64()),
+        ('processed_at', pa.string()),
+    ])
+try:
+    import xxhash
+except ImportError:  # Optional: content fingerprints fall back to hashlib's BLAKE2b
+    xxhash = None
+try:
+    from semantic_text_splitter import TextSplitter as NativeTextSplitter
+except ImportError:  # Optional: falls back to _fast_split
+    NativeTextSplitter = None
+try:
+    from tqdm import tqdm
+except ImportError:  # Optional: progress bars are then skipped
+    tqdm = None
+try:
+    from bs4 import BeautifulSoup
+except ImportError:  # Required for parsing pages; HMRCDocumentLoader prints the install hint
+    BeautifulSoup = None
+# Optional: BeautifulSoup's C-backed lxml parser, else the stdlib parser
+_HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
 from langchain.schema import Document
 
 
+# Fragments that point at page furniture rather than distinct content
+_BOILERPLATE_FRAGMENTS = frozenset({'content', 'main-content', 'top'})
+
+# A link into the Employment-Related Securities Manual: (page URL without query, fragment)
+_MANUAL_URL_RE = re.compile(
+    r'(https?://(?:[^/?#]*\.)?gov\.uk/hmrc-internal-manuals/employment-related-securities[^?#]*)'
+    r'(?:\?[^#]*)?(?:#(.*))?\Z'
+)
+
+# Linked resources that are not HTML manual pages
+_NON_HTML_EXTENSIONS = frozenset({'pdf', 'doc', 'docx', 'xls', 'xlsx'})
+
+# ERSM section code in a manual URL, e.g. /ersm20020
+_ERSM_CODE_RE = re.compile(r'/ersm(\d+)')
+
+# Broader categories for URLs without an ERSM code, checked in order
+_LEGACY_SECTIONS = (
+    ('ersm11', 'ersm110000_general_principles'),
+    ('ersm2', 'ersm20000_share_schemes'),
+    ('ersm3', 'ersm30000_tax_implications'),
+    ('capital-gains', 'capital_gains_manual'),
+    ('income-tax', 'income_tax_manual'),
+    ('share-schemes', 'share_schemes'),
+)
+
+
+class _ParquetDocumentWriter:
+    """Appends documents to a Parquet file in row groups, so the corpus is never held at once."""
+    
+    def __init__(self, path: str, row_group_size: int = 1024):
+        self.row_group_size = row_group_size
+        self._rows: List[Dict[str, Any]] = []
+        self._writer = pq.ParquetWriter(path, _PARQUET_SCHEMA, compression='zstd')
+    
+    def write(self, doc: Document) -> None:
+        self._rows.append({**doc.metadata, 'content': doc.page_content})
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+    
+    def _flush(self) -> None:
+        if self._rows:
+            # Repeated strings (source_url, section, ...) are dictionary-encoded by Parquet
+            self._writer.write_table(pa.Table.from_pylist(self._rows, schema=_PARQUET_SCHEMA))
+            self._rows = []
+    
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+def iter_parquet_documents(path: str, batch_size: int = 256) -> Iterator[Document]:
+    """Yield the documents of a saved Parquet file, dropping metadata keys a row never had.
+    
+    The file is memory-mapped and decoded one record batch at a time, so only the
+    rows currently being consumed are materialized.
+    """
+    if pq is None:
+        raise ImportError("Reading Parquet document files requires pyarrow: pip install pyarrow")
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        for row in batch.to_pylist():
+            content = row.pop('content')
+            yield Document(
+                page_content=content,
+                metadata={key: value for key, value in row.items() if value is not None}
+            )
+
+
+def _fingerprint(data: bytes) -> int:
+    """Fast 64-bit non-cryptographic fingerprint of raw bytes."""
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def _content_fingerprint(text: str) -> int:
+    """64-bit fingerprint of text with whitespace runs collapsed, for exact-duplicate detection."""
+    return _fingerprint(' '.join(text.split()).encode('utf-8'))
+
+
+# Chunking configuration: maximum characters per chunk and characters shared by neighbours
+_CHUNK_SIZE = 1000
+_CHUNK_OVERLAP = 200
+
+# Preferred chunk boundaries, strongest first
+_CHUNK_SEPARATORS = ('\n\n', '\n', ' ')
+
+
+def _fast_split(text: str, size: int = _CHUNK_SIZE, overlap: int = _CHUNK_OVERLAP) -> List[str]:
+    """Split text into chunks of at most ``size`` characters in one linear scan.
+    
+    Each chunk ends at the last paragraph break, line break or space that fits
+    (a hard cut if none does), and the next chunk starts about ``overlap``
+    characters earlier, at a word boundary. Chunks are whitespace-stripped and
+    empty ones dropped, as with RecursiveCharacterTextSplitter.
+    """
+    chunks = []
+    length = len(text)
+    start = 0
+    while start < length:
+        end = start + size
+        if end >= length:
+            end = length
+        else:
+            # Only accept breaks past the overlap so every step makes progress
+            for separator in _CHUNK_SEPARATORS:
+                position = text.rfind(separator, start + overlap + 1, end)
+                if position != -1:
+                    end = position
+                    break
+        
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= length:
+            break
+        
+        start = end - overlap
+        word_break = text.find(' ', start, end)
+        if word_break != -1:
+            start = word_break + 1
+    return chunks
+
+
+def _make_native_splitter():
+    """Rust-backed splitter with the loader's chunk size and overlap."""
+    return NativeTextSplitter(capacity=_CHUNK_SIZE, overlap=_CHUNK_OVERLAP)
+
+
+# Splitting function of a split worker process, set once by _init_split_worker
+_worker_split_text = None
+
+
+def _init_split_worker(use_native: bool) -> None:
+    global _worker_split_text
+    # The native splitter can't be pickled, so each worker builds its own
+    _worker_split_text = _make_native_splitter().chunks if use_native else _fast_split
+
+
+def _split_in_worker(text: str) -> List[str]:
+    return _worker_split_text(text)
+
+
+def _json_bytes(obj: Any, indent: bool = False) -> bytes:
+    """UTF-8 JSON encoding (compact, or two-space indented), using orjson when available."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+def _json_loads(data: bytes) -> Any:
+    """Decode JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Write a file via a temporary sibling and rename, so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class _RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` requests per second on average."""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _reserve(self) -> float:
+        """Take a token if one is available, else return the seconds to wait before retrying."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+    
+    async def acquire_async(self) -> None:
+        """Wait without blocking the event loop until a request token is available."""
+        wait = self._reserve()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self._reserve()
+    
+    def pause(self, seconds: float) -> None:
+        """Hold back all requests for ``seconds``, e.g. when the server asks us to slow down."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class _HostRateLimiter:
+    """A separate token bucket per host, so throttling by one host doesn't slow the others."""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._limiters: Dict[str, _RateLimiter] = {}
+        self._lock = threading.Lock()
+    
+    def for_url(self, url: str) -> _RateLimiter:
+        host = urlparse(url).netloc
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = _RateLimiter(self.rate, self.burst)
+            return limiter
+
+
+# Responses that mean "slow down": honored via Retry-After before retrying the request
+_THROTTLE_STATUSES = frozenset({429, 503})
+_MAX_THROTTLE_RETRIES = 3
+_THROTTLE_BACKOFF = 5.0  # Seconds before the first retry when the server sends no Retry-After
+
+
+def _retry_after_seconds(value: Optional[str], default: float = _THROTTLE_BACKOFF) -> float:
+    """Parse a Retry-After header given either as delta-seconds or as an HTTP date."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Bump when page parsing changes, so parses cached by earlier versions are ignored
+_PARSED_PAGE_VERSION = 1
+
+
+class _PageCache:
+    """On-disk cache of fetched pages keyed by URL, with HTTP validators for revalidation."""
+    
+    def __init__(self, cache_dir: str, max_age: float):
+        self.cache_dir = cache_dir
+        self.max_age = max_age  # Seconds a page is served without contacting the server
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def _path(self, url: str, suffix: str = '.json.gz') -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + suffix)
+    
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with gzip.open(path, 'rb') as f:
+                return _json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+    
+    def _write(self, path: str, entry: Dict[str, Any]) -> None:
+        """Store an entry atomically so concurrent readers never see a partial file."""
+        data = gzip.compress(_json_bytes(entry), compresslevel=1)
+        try:
+            _write_atomic(path, data)
+        except OSError:
+            pass  # The cache is best-effort; the page is simply fetched again next time
+    
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for a URL, or None if absent or unreadable."""
+        return self._read(self._path(url))
+    
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry.get('fetched_at', 0) < self.max_age
+    
+    @staticmethod
+    def validators(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Conditional-GET headers for a cached entry."""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def put(self, url: str, html: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        self._write(self._path(url), {
+            'url': url,
+            'html': html,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time()
+        })
+    
+    def get_parsed(self, url: str, html_fingerprint: int) -> Optional[Dict[str, Any]]:
+        """Return a previous parse of the page if it was made from identical HTML."""
+        entry = self._read(self._path(url, '.parsed.json.gz'))
+        if (entry and entry.get('version') == _PARSED_PAGE_VERSION and
+                entry.get('html_fingerprint') == html_fingerprint):
+            return entry
+        return None
+    
+    def put_parsed(self, url: str, html_fingerprint: int, document: Document, links: Set[str]) -> None:
+        self._write(self._path(url, '.parsed.json.gz'), {
+            'version': _PARSED_PAGE_VERSION,
+            'html_fingerprint': html_fingerprint,
+            'content': document.page_content,
+            'metadata': document.metadata,
+            'links': list(links)
+        })
+
+
+class FailedURL(NamedTuple):
+    """A URL that could not be crawled or loaded."""
+    url: str
+    error: str
+    stage: str  # 'link_discovery' or 'document_loading'
+    depth: int
+
+
 class HMRCDocumentLoader:
     """Enhanced HMRC document loader that follows internal links to build comprehensive knowledge base."""
     
-    def __init__(self, data_dir: str = "data", max_depth: int = None, max_pages: int = 1000):
+    def __init__(self, data_dir: str = "data", max_depth: int = None, max_pages: int = 1000,
+                 max_concurrency: int = 10, requests_per_second: float = 5.0,
+                 use_cache: bool = True, cache_max_age: float = 86400,
+                 use_native_splitter: bool = True, split_workers: Optional[int] = None,
+                 verbose: bool = False):
         self.data_dir = data_dir
         self.max_depth = max_depth  # None means no depth limit, use smart filtering instead
         self.max_pages = max_pages
+        self.max_concurrency = max_concurrency  # Simultaneous in-flight page fetches
+        self.verbose = verbose  # Per-URL progress lines instead of progress bars
+        
+        # Crawl politeness: average request rate per host across discovery and document loading
+        self._rate_limiter = _HostRateLimiter(requests_per_second)
         
         # Starting URL - main HMRC Employment-Related Securities Manual index
         self.seed_urls = [
@@ -28,15 +426,30 @@ class HMRCDocumentLoader:
         # Track discovered URLs and their depth
         self.discovered_urls: Dict[str, int] = {}
         self.processed_urls: Set[str] = set()
-        self.failed_urls: List[Dict[str, Any]] = []
+        self.failed_urls: List[FailedURL] = []
+        self._link_cache: Dict[str, Optional[str]] = {}  # Memoised _filter_and_clean results
+        
+        # Event loop and HTTP session shared by discovery and every load window; see close()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        # Pages fetched during discovery, awaiting load_documents. With the page cache
+        # only the HTML fingerprint is kept and the Document is rebuilt from the parse cache
+        self._crawled_pages: Dict[str, Union[Document, int]] = {}
+        
+        # Running counts from the most recent iter_documents / iter_chunks pass;
+        # duplicate_pages counts pages skipped because their text repeated an earlier page
+        self.duplicate_pages = 0
+        self.documents_loaded = 0
+        self.chunks_created = 0
         
-        # Text splitter configuration
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
+        # Rust-backed splitter, used when installed; otherwise _fast_split with the same size/overlap
+        self.native_splitter = None
+        if use_native_splitter and NativeTextSplitter is not None:
+            self.native_splitter = _make_native_splitter()
+        
+        # Processes used to split documents into chunks; None means one per CPU core
+        self.split_workers = split_workers or os.cpu_count() or 1
         
         # Request headers
         self.headers = {
@@ -49,16 +462,44 @@ class HMRCDocumentLoader:
         
         # Ensure data directory exists
         os.makedirs(self.data_dir, exist_ok=True)
+        
+        # Fetched pages are cached on disk so re-runs skip (or cheaply revalidate) the network
+        self.page_cache = _PageCache(os.path.join(self.data_dir, 'http_cache'), cache_max_age) if use_cache else None
+        
+        if BeautifulSoup is None:
+            print("❌ BeautifulSoup not available. Install with: pip install beautifulsoup4")
+    
+    def _progress(self, total: int, desc: str):
+        """Progress bar for a per-URL loop, or None in verbose mode or without tqdm."""
+        if self.verbose or tqdm is None:
+            return None
+        return tqdm(total=total, desc=desc, unit='page', leave=False)
+    
+    def _log(self, message: str) -> None:
+        """Per-URL detail, printed only in verbose mode."""
+        if self.verbose:
+            print(message)
+    
+    @staticmethod
+    def _warn(message: str) -> None:
+        """Print a message without breaking an active progress bar."""
+        if tqdm is not None:
+            tqdm.write(message)
+        else:
+            print(message)
     
     def extract_hmrc_links(self, html_content: str, base_url: str) -> Set[str]:
-        """Extract internal HMRC links from HTML content."""
-        try:
-            from bs4 import BeautifulSoup
-        except ImportError:
-            print("❌ BeautifulSoup not available. Install with: pip install beautifulsoup4")
+        """Extract internal HMRC links from HTML content, already cleaned by _filter_and_clean.
+        
+        The crawler gets links from _parse_page, which shares one parse with the page text.
+        """
+        if BeautifulSoup is None:
             return set()
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        return self._links_from_soup(self._make_soup(html_content), base_url)
+    
+    def _links_from_soup(self, soup, base_url: str) -> Set[str]:
+        """Collect cleaned manual links from an already parsed page."""
         links = set()
         
         # Find all links
@@ -68,129 +509,133 @@ class HMRCDocumentLoader:
             # Convert relative URLs to absolute
             full_url = urljoin(base_url, href)
             
-            # Only include HMRC employment-related securities links
-            if self._is_relevant_hmrc_link(full_url):
-                links.add(full_url)
+            # Only include HMRC employment-related securities links; pages cross-link
+            # heavily, so each absolute URL is judged once per loader
+            if full_url in self._link_cache:
+                clean_url = self._link_cache[full_url]
+            else:
+                clean_url = self._link_cache[full_url] = self._filter_and_clean(full_url)
+            if clean_url:
+                links.add(clean_url)
         
         return links
     
-    def _is_relevant_hmrc_link(self, url: str) -> bool:
-        """Check if URL is within the HMRC Employment-Related Securities Manual."""
-        # Must be gov.uk domain
-        if 'gov.uk' not in url:
-            return False
-        
-        # Must be HMRC internal manual
-        if '/hmrc-internal-manuals/' not in url:
-            return False
-        
-        # Must be within employment-related-securities manual only
-        if '/employment-related-securities' not in url:
-            return False
-        
-        # Exclude fragments and query parameters that don't add content
-        parsed_url = urlparse(url)
-        if parsed_url.fragment and not parsed_url.path.endswith(parsed_url.fragment):
-            # Skip pure fragment links like #content unless they're meaningful
-            if parsed_url.fragment in ['content', 'main-content', 'top']:
-                return False
-        
-        # Skip PDF and other non-HTML resources
-        if url.lower().endswith(('.pdf', '.doc', '.docx', '.xls', '.xlsx')):
-            return False
-        
-        return True
+    @staticmethod
+    def _make_soup(markup: str):
+        """Parse HTML with the lxml C parser when installed, else the stdlib parser."""
+        return BeautifulSoup(markup, _HTML_PARSER)
     
-    def _clean_url(self, url: str) -> str:
-        """Clean URL by removing unnecessary fragments and parameters."""
-        from urllib.parse import urlparse, urlunparse
+    def _filter_and_clean(self, url: str) -> Optional[str]:
+        """Return the cleaned URL of a link within the HMRC Employment-Related Securities Manual.
         
-        parsed = urlparse(url)
+        Returns None for links that shouldn't be followed. Query parameters (they
+        usually don't add content in HMRC manuals) and boilerplate fragments are removed.
+        """
+        match = _MANUAL_URL_RE.match(url)
+        if match is None:
+            return None
+        page_url, fragment = match.groups()
         
-        # Remove fragments that don't add content value
-        fragment = parsed.fragment
-        if fragment in ['content', 'main-content', 'top', '']:
-            fragment = ''
+        # Skip PDF and other non-HTML resources (checking only a short extension)
+        extension = page_url.rpartition('.')[2]
+        if len(extension) <= 4 and extension.lower() in _NON_HTML_EXTENSIONS:
+            return None
         
-        # Remove query parameters (they usually don't add content in HMRC manuals)
-        query = ''
+        # Skip pure fragment links like #content unless they're meaningful
+        if fragment in _BOILERPLATE_FRAGMENTS:
+            return page_url if page_url.endswith(fragment) else None
         
-        # Reconstruct clean URL
-        clean_parsed = parsed._replace(fragment=fragment, query=query)
-        return urlunparse(clean_parsed)
+        return f"{page_url}#{fragment}" if fragment else page_url
     
     def discover_links(self, max_depth: int = None) -> None:
         """Comprehensively discover all HMRC Employment-Related Securities Manual links."""
-        try:
-            import requests
-        except ImportError:
-            print("❌ Requests not available. Install with: pip install requests")
-            return
-        
         print(f"🔍 Comprehensively crawling HMRC Employment-Related Securities Manual...")
         print(f"📋 Configuration: max_pages={self.max_pages}, smart_filtering=True")
         
+        depth = self._run(self._discover_links_async())
+        
+        print(f"\n🎯 Comprehensive crawling complete!")
+        print(f"📊 Final statistics:")
+        print(f"   • Total URLs discovered: {len(self.discovered_urls)}")
+        print(f"   • URLs processed: {len(self.processed_urls)}")
+        print(f"   • Failed URLs: {len(self.failed_urls)}")
+        print(f"   • Max depth reached: {depth-1}")
+        
+        # Save discovered URLs
+        self._save_discovered_urls()
+    
+    async def _discover_links_async(self) -> int:
+        """Breadth-first crawl fetching each level concurrently; returns the number of levels crawled."""
         # Use breadth-first search to ensure we don't get stuck in deep branches
         queue = list(self.seed_urls)
         depth = 0
         
+        # Seeds count as discovered, so discovered_urls alone answers "seen before?"
+        for url in self.seed_urls:
+            self.discovered_urls.setdefault(url, 0)
+        
+        # One keep-alive connection pool shared by every level of the crawl
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        session = await self._get_session()
         while queue and len(self.discovered_urls) < self.max_pages:
-            current_level = queue.copy()
+            current_level = [url for url in queue if url not in self.processed_urls]
             queue.clear()
-            next_level_urls = set()
+            next_level_urls = []
             
             if not current_level:
                 break
                 
             print(f"\n🌐 Processing level {depth} with {len(current_level)} URLs...")
             
-            for url in current_level:
+            # Fetch the whole level concurrently; results are merged in request order
+            progress = self._progress(len(current_level), f"🌐 Level {depth}")
+            
+            async def fetch(url: str) -> Tuple[str, Optional[str], Optional[str]]:
+                result = await self._fetch_async(session, semaphore, url)
+                if progress is not None:
+                    progress.update(1)
+                return result
+            
+            results = await asyncio.gather(*(fetch(url) for url in current_level))
+            if progress is not None:
+                progress.close()
+            
+            for url, html, error in results:
                 if len(self.discovered_urls) >= self.max_pages:
                     print(f"🛑 Reached maximum pages limit ({self.max_pages})")
                     break
-                    
-                if url in self.processed_urls:
-                    continue
                 
                 try:
-                    print(f"  🔗 Crawling: {url}")
+                    self._log(f"  🔗 Crawling: {url}")
+                    if error is not None:
+                        raise RuntimeError(error)
                     
-                    # Fetch the page
-                    response = requests.get(url, headers=self.headers, timeout=30)
-                    response.raise_for_status()
+                    # Parse once for both the links and the page text
+                    doc, new_links = self._parse_page(url, html)
                     
-                    # Extract links
-                    new_links = self.extract_hmrc_links(response.text, url)
+                    # Remember the page so load_documents doesn't fetch it again
+                    self._crawled_pages[url] = (_fingerprint(html.encode('utf-8'))
+                                                if self.page_cache else doc)
                     
                     # Add new unique links for next level
                     new_count = 0
-                    for link in new_links:
-                        # Clean the URL (remove fragments that don't add content)
-                        clean_link = self._clean_url(link)
-                        
-                        if (clean_link not in self.discovered_urls and 
-                            clean_link not in self.processed_urls and
-                            len(self.discovered_urls) < self.max_pages):
+                    for clean_link in new_links:
+                        if len(self.discovered_urls) >= self.max_pages:
+                            break
+                        # Every queued or processed URL is in discovered_urls: one lookup suffices
+                        if clean_link not in self.discovered_urls:
                             self.discovered_urls[clean_link] = depth + 1
-                            next_level_urls.add(clean_link)
+                            next_level_urls.append(clean_link)
                             new_count += 1
                     
-                    print(f"    ✓ Found {new_count} new links")
+                    self._log(f"    ✓ Found {new_count} new links")
                     
                     # Mark as processed
                     self.processed_urls.add(url)
                     
-                    # Rate limiting to be respectful
-                    time.sleep(0.5)
-                    
                 except Exception as e:
-                    print(f"    ✗ Error crawling {url}: {str(e)}")
-                    self.failed_urls.append({
-                        'url': url,
-                        'error': str(e),
-                        'stage': 'link_discovery',
-                        'depth': depth
-                    })
+                    self._warn(f"    ✗ Error crawling {url}: {str(e)}")
+                    self.failed_urls.append(FailedURL(url, str(e), 'link_discovery', depth))
                     self.processed_urls.add(url)
             
             # Prepare next level
@@ -205,93 +650,284 @@ class HMRCDocumentLoader:
                 print(f"⚠️  Reached maximum depth safety limit (20)")
                 break
         
-        print(f"\n🎯 Comprehensive crawling complete!")
-        print(f"📊 Final statistics:")
-        print(f"   • Total URLs discovered: {len(self.discovered_urls)}")
-        print(f"   • URLs processed: {len(self.processed_urls)}")
-        print(f"   • Failed URLs: {len(self.failed_urls)}")
-        print(f"   • Max depth reached: {depth-1}")
-        
-        # Save discovered URLs
-        self._save_discovered_urls()
+        return depth
     
     def load_documents(self, discover_links: bool = True, url_list: List[str] = None) -> List[Document]:
         """Load documents from HMRC URLs with optional link discovery or predefined URL list."""
+        return list(self.iter_documents(discover_links=discover_links, url_list=url_list))
+    
+    def iter_documents(self, discover_links: bool = True, url_list: List[str] = None) -> Iterator[Document]:
+        """Yield documents from HMRC URLs as they load, holding only one fetch window of pages."""
         if url_list:
-            # Use predefined URL list instead of discovery
-            self.discovered_urls = {url: 0 for url in url_list}
-            print(f"📋 Using predefined URL list with {len(url_list)} URLs")
+            # Use predefined URL list instead of discovery (duplicates are fetched once)
+            self.discovered_urls = dict.fromkeys(url_list, 0)
+            print(f"📋 Using predefined URL list with {len(self.discovered_urls)} unique URLs")
         elif discover_links:
             self.discover_links()
         
-        all_documents = []
+        self.documents_loaded = 0
+        self.duplicate_pages = 0
         total_urls = len(self.discovered_urls)
         
         print(f"\n📚 Loading documents from {total_urls} discovered HMRC URLs...")
         
-        for i, (url, depth) in enumerate(self.discovered_urls.items(), 1):
-            try:
-                print(f"📄 [{i}/{total_urls}] Loading (depth {depth}): {url}")
-                
-                # Use WebBaseLoader to scrape the URL
-                loader = WebBaseLoader(
-                    web_paths=[url],
-                    header_template=self.headers
-                )
-                
-                # Load the document
-                docs = loader.load()
-                
-                # Add metadata to each document
-                for doc in docs:
-                    doc.metadata.update({
-                        'source_url': url,
-                        'loaded_at': datetime.now().isoformat(),
-                        'document_type': 'hmrc_employment_securities',
-                        'section': self._extract_section_from_url(url),
-                        'discovery_depth': depth,
-                        'page_title': self._extract_page_title(doc.page_content)
-                    })
+        # URLs are fetched a window at a time so memory stays bounded while requests overlap
+        urls = list(self.discovered_urls.items())
+        window_size = self.max_concurrency * 4
+        seen_fingerprints = set()
+        
+        # One timestamp for the whole batch
+        loaded_at = datetime.now().isoformat()
+        
+        progress = self._progress(total_urls, "📚 Loading")
+        try:
+            for start in range(0, total_urls, window_size):
+                window = urls[start:start + window_size]
                 
-                all_documents.extend(docs)
-                print(f"    ✓ Successfully loaded {len(docs)} document(s)")
+                # Pages already fetched during discovery are reused; the rest are fetched concurrently
+                pending = [url for url, _ in window if url not in self._crawled_pages]
+                fetched = {}
+                if pending:
+                    for url, html, error in self._run(self._fetch_all(pending)):
+                        fetched[url] = (html, error)
                 
-                # Rate limiting
-                time.sleep(0.5)
+                for i, (url, depth) in enumerate(window, start + 1):
+                    self._log(f"📄 [{i}/{total_urls}] Loading (depth {depth}): {url}")
+                    if progress is not None:
+                        progress.update(1)
+                    
+                    try:
+                        doc = self._take_crawled_page(url)
+                        if doc is None and url not in fetched:
+                            # Parse-cache entry vanished since discovery: fetch the page again
+                            for _, html, error in self._run(self._fetch_all([url])):
+                                fetched[url] = (html, error)
+                        if doc is None:
+                            html, error = fetched.pop(url)
+                            if error is not None:
+                                raise RuntimeError(error)
+                            doc, _ = self._parse_page(url, html)
+                        
+                        # Drop pages whose body text exactly duplicates one already loaded
+                        fingerprint = _content_fingerprint(doc.page_content)
+                        if fingerprint in seen_fingerprints:
+                            self.duplicate_pages += 1
+                            self._log(f"    ↺ Skipped: content duplicates an earlier page")
+                            continue
+                        seen_fingerprints.add(fingerprint)
+                        
+                        # Page-level metadata for the loaded document
+                        doc.metadata.update({
+                            'source_url': url,
+                            'loaded_at': loaded_at,
+                            'document_type': 'hmrc_employment_securities',
+                            'section': self._extract_section_from_url(url),
+                            'discovery_depth': depth
+                        })
+                        
+                        self._log("    ✓ Successfully loaded document")
+                        
+                    except Exception as e:
+                        self._warn(f"    ✗ Failed to load {url}: {str(e)}")
+                        self.failed_urls.append(FailedURL(url, str(e), 'document_loading', depth))
+                        continue
+                    
+                    self.documents_loaded += 1
+                    yield doc
                 
-            except Exception as e:
-                print(f"    ✗ Failed to load {url}: {str(e)}")
-                self.failed_urls.append({
-                    'url': url, 
-                    'error': str(e),
-                    'stage': 'document_loading',
-                    'depth': depth
-                })
-                continue
+                if progress is not None:
+                    progress.set_postfix(loaded=self.documents_loaded, failed=len(self.failed_urls))
+        finally:
+            if progress is not None:
+                progress.close()
+            # Release pages left behind if the caller stopped iterating early
+            self._crawled_pages.clear()
+            # Crawling and loading are done with the shared session
+            self.close()
         
         if self.failed_urls:
             print(f"\n⚠️  Failed to load {len(self.failed_urls)} URLs")
             self._save_failed_urls(self.failed_urls)
         
-        print(f"\n✅ Total documents loaded: {len(all_documents)}")
-        print(f"📊 Coverage: {len(all_documents)} docs from {len(self.discovered_urls)} URLs")
+        print(f"\n✅ Total documents loaded: {self.documents_loaded}")
+        print(f"📊 Coverage: {self.documents_loaded} docs from {len(self.discovered_urls)} URLs")
+        if self.duplicate_pages:
+            print(f"♻️  Skipped {self.duplicate_pages} pages with duplicate content")
+    
+    def _run(self, coro):
+        """Run a coroutine on the loader's event loop, which outlives each call with its session."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = self._client_session()
+        return self._session
+    
+    def close(self) -> None:
+        """Close the shared HTTP session and event loop; they are recreated if needed again."""
+        if self._loop is None:
+            return
+        if self._session is not None and not self._session.closed:
+            self._loop.run_until_complete(self._session.close())
+        self._session = None
+        self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        self._loop.run_until_complete(self._loop.shutdown_default_executor())
+        self._loop.close()
+        self._loop = None
+    
+    def _client_session(self) -> aiohttp.ClientSession:
+        """Create the pooled keep-alive HTTP session used for crawling and loading."""
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency * 2, limit_per_host=self.max_concurrency,
+                                         keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=30)
+        return aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout)
+    
+    async def _fetch_all(self, urls: List[str]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        """Fetch raw HTML for all URLs concurrently over a single pooled session.
+        
+        Returns (url, html, error) tuples in the same order as ``urls``; exactly
+        one of ``html`` and ``error`` is set for each URL.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        session = await self._get_session()
+        return await asyncio.gather(*(self._fetch_async(session, semaphore, url) for url in urls))
+    
+    async def _fetch_async(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                           url: str) -> Tuple[str, Optional[str], Optional[str]]:
+        """Fetch one page via the cache, the host's rate limit and Retry-After; never raises."""
+        cached = self.page_cache.get(url) if self.page_cache else None
+        if cached and self.page_cache.is_fresh(cached):
+            return url, cached['html'], None
+        
+        # The semaphore caps in-flight requests; the host's limiter caps the request rate
+        limiter = self._rate_limiter.for_url(url)
+        async with semaphore:
+            try:
+                for attempt in range(_MAX_THROTTLE_RETRIES + 1):
+                    await limiter.acquire_async()
+                    async with session.get(url, headers=_PageCache.validators(cached)) as response:
+                        if response.status in _THROTTLE_STATUSES and attempt < _MAX_THROTTLE_RETRIES:
+                            # Without a Retry-After hint, back off exponentially: 5s, 10s, 20s
+                            limiter.pause(_retry_after_seconds(response.headers.get('Retry-After'),
+                                                               default=_THROTTLE_BACKOFF * 2 ** attempt))
+                            continue
+                        
+                        etag = response.headers.get('ETag')
+                        last_modified = response.headers.get('Last-Modified')
+                        if cached and response.status == 304:
+                            html = cached['html']
+                            # A 304 may omit the validators; keep the stored ones so revalidation stays conditional
+                            etag = etag or cached.get('etag')
+                            last_modified = last_modified or cached.get('last_modified')
+                        else:
+                            response.raise_for_status()
+                            html = await response.text()
+                        
+                        if self.page_cache:
+                            self.page_cache.put(url, html, etag, last_modified)
+                        return url, html, None
+            except Exception as e:
+                return url, None, str(e) or type(e).__name__
+    
+    def _take_crawled_page(self, url: str) -> Optional[Document]:
+        """Remove and return the Document kept for a page fetched during discovery."""
+        entry = self._crawled_pages.pop(url, None)
+        if entry is None or isinstance(entry, Document):
+            return entry
+        parsed = self.page_cache.get_parsed(url, entry) if self.page_cache else None
+        if not parsed:
+            return None
+        return Document(page_content=parsed['content'], metadata=parsed['metadata'])
+    
+    def _parse_page(self, url: str, html: str) -> Tuple[Document, Set[str]]:
+        """Parse a page once into its Document and outgoing manual links.
+        
+        With the page cache enabled, the result is stored keyed by a fingerprint
+        of the HTML, so unchanged pages are not parsed again on later runs.
+        """
+        html_fingerprint = None
+        if self.page_cache:
+            html_fingerprint = _fingerprint(html.encode('utf-8'))
+            parsed = self.page_cache.get_parsed(url, html_fingerprint)
+            if parsed:
+                document = Document(page_content=parsed['content'], metadata=parsed['metadata'])
+                return document, set(parsed['links'])
+        
+        soup = self._make_soup(html)
+        document = self._soup_to_document(url, soup)
+        links = self._links_from_soup(soup, url)
+        if self.page_cache:
+            self.page_cache.put_parsed(url, html_fingerprint, document, links)
+        return document, links
+    
+    def _soup_to_document(self, url: str, soup) -> Document:
+        """Build a Document from a parsed page, mirroring WebBaseLoader's text and metadata."""
+        metadata = {'source': url}
+        title = soup.find('title')
+        if title:
+            metadata['title'] = title.get_text()
+        description = soup.find('meta', attrs={'name': 'description'})
+        if description:
+            metadata['description'] = description.get('content', 'No description found.')
+        html_tag = soup.find('html')
+        if html_tag:
+            metadata['language'] = html_tag.get('lang', 'No language found.')
+        
+        # Page heading, falling back to the <title> text
+        heading = soup.find('h1')
+        page_title = heading.get_text(' ', strip=True) if heading else ''
+        if not page_title and title:
+            page_title = ' '.join(title.get_text().split())
+        metadata['page_title'] = page_title or 'Unknown'
+        
+        return Document(page_content=soup.get_text(), metadata=metadata)
+    
+    def _split_text(self, text: str) -> List[str]:
+        """Split text with the native splitter when available, else _fast_split."""
+        if self.native_splitter is not None:
+            return self.native_splitter.chunks(text)
+        return _fast_split(text)
+    
+    def _split_all(self, documents: Iterable[Document]) -> Iterator[Tuple[Document, List[str]]]:
+        """Yield (document, chunk texts) in input order, splitting across worker processes.
+        
+        Documents are dispatched in windows so the input stream is consumed lazily;
+        the next window is read and submitted before the current one is yielded,
+        so workers keep splitting while upstream fetching and downstream saving run.
+        """
+        if self.split_workers <= 1:
+            for doc in documents:
+                yield doc, self._split_text(doc.page_content)
+            return
         
-        return all_documents
+        initargs = (self.native_splitter is not None,)
+        # Workers are spawned rather than forked: by now the fetch thread and the event loop
+        # are running, and a forked child could inherit a lock one of them was holding
+        with ProcessPoolExecutor(max_workers=self.split_workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_split_worker, initargs=initargs) as executor:
+            documents = iter(documents)
+            in_flight = None
+            while True:
+                window = list(islice(documents, self.split_workers * 16))
+                submitted = None
+                if window:
+                    texts = executor.map(_split_in_worker, [doc.page_content for doc in window], chunksize=4)
+                    submitted = zip(window, texts)
+                if in_flight is not None:
+                    yield from in_flight
+                if submitted is None:
+                    break
+                in_flight = submitted
     
-    def split_documents(self, documents: List[Document]) -> List[Document]:
-        """Split documents into chunks using RecursiveCharacterTextSplitter."""
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """Split documents into chunks, each inheriting its source document's metadata."""
         print("🔪 Splitting documents into chunks...")
         
         try:
-            chunks = self.text_splitter.split_documents(documents)
-            
-            # Add chunk metadata
-            for i, chunk in enumerate(chunks):
-                chunk.metadata.update({
-                    'chunk_id': i,
-                    'chunk_size': len(chunk.page_content),
-                    'processed_at': datetime.now().isoformat()
-                })
+            chunks = list(self.iter_chunks(documents))
             
             print(f"✓ Split into {len(chunks)} chunks")
             return chunks
@@ -300,97 +936,178 @@ class HMRCDocumentLoader:
             print(f"✗ Error splitting documents: {str(e)}")
             raise
     
-    def save_documents(self, documents: List[Document], filename: str = None) -> str:
-        """Save processed documents to the data folder."""
+    def iter_chunks(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Lazily split documents, yielding chunks numbered in order across the whole stream."""
+        self.chunks_created = 0
+        
+        # One timestamp for the whole batch
+        processed_at = datetime.now().isoformat()
+        for doc, texts in self._split_all(documents):
+            for text in texts:
+                chunk = Document(page_content=text, metadata=dict(doc.metadata))
+                chunk.metadata.update({
+                    'chunk_id': self.chunks_created,
+                    'chunk_size': len(text),
+                    'processed_at': processed_at
+                })
+                self.chunks_created += 1
+                yield chunk
+    
+    def save_documents(self, documents: Iterable[Document], filename: str = None,
+                       legacy_pickle: bool = False, human_readable: bool = False) -> str:
+        """Save processed documents to the data folder in a single streaming pass.
+        
+        Documents are stored as zstd-compressed Parquet when pyarrow is installed,
+        written in row groups as they arrive, and read back in row-group batches by
+        the vector store. A pickle export is written only with ``legacy_pickle=True``
+        (or when pyarrow is missing); it needs the full list, so its path is returned
+        whenever it is written. Pass ``human_readable=True`` to also write the corpus
+        as a JSON array.
+        """
         if filename is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"hmrc_docs_enhanced_{timestamp}"
         
+        parquet_writer = None
         try:
-            # Save as pickle for easy loading with metadata
-            pickle_path = os.path.join(self.data_dir, f"{filename}.pkl")
-            with open(pickle_path, 'wb') as f:
-                pickle.dump(documents, f)
-            
-            # Save as JSON for human readability
-            json_path = os.path.join(self.data_dir, f"{filename}.json")
-            json_data = []
-            for doc in documents:
-                json_data.append({
-                    'content': doc.page_content,
-                    'metadata': doc.metadata
-                })
+            files = {}
+            
+            # Save as Parquet: columnar, compressed and fast to reload
+            if pq is not None:
+                parquet_path = os.path.join(self.data_dir, f"{filename}.parquet")
+                parquet_writer = _ParquetDocumentWriter(parquet_path)
+                files['parquet'] = parquet_path
+            
+            # Pickle for existing consumers is a single list, so it is collected as we go
+            pickled_documents = [] if legacy_pickle or pq is None else None
             
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, indent=2, ensure_ascii=False)
+            # Statistics are accumulated during the same pass
+            total_documents = 0
+            total_characters = 0
+            depth_stats = Counter()
+            section_stats = Counter()
+            source_urls = set()
+            
+            # Optional JSON copy for human readability, streamed one document per line
+            json_file = None
+            if human_readable:
+                json_path = os.path.join(self.data_dir, f"{filename}.json")
+                json_file = open(json_path, 'wb')
+                json_file.write(b'[\n')
+                files['json'] = json_path
+            
+            try:
+                for doc in documents:
+                    metadata = doc.metadata
+                    if json_file is not None:
+                        if total_documents:
+                            json_file.write(b',\n')
+                        json_file.write(_json_bytes({
+                            'content': doc.page_content,
+                            'metadata': metadata
+                        }))
+                    
+                    if parquet_writer is not None:
+                        parquet_writer.write(doc)
+                    if pickled_documents is not None:
+                        pickled_documents.append(doc)
+                    
+                    total_documents += 1
+                    total_characters += len(doc.page_content)
+                    depth_stats[metadata.get('discovery_depth', 0)] += 1
+                    section_stats[metadata.get('section', 'unknown')] += 1
+                    source_urls.add(metadata.get('source_url'))
+                
+                if json_file is not None:
+                    json_file.write(b'\n]\n')
+            finally:
+                if json_file is not None:
+                    json_file.close()
+            
+            if parquet_writer is not None:
+                parquet_writer.close()
+                parquet_writer = None
+            
+            if pickled_documents is not None:
+                pickle_path = os.path.join(self.data_dir, f"{filename}.pkl")
+                with open(pickle_path, 'wb') as f:
+                    pickle.dump(pickled_documents, f, protocol=pickle.HIGHEST_PROTOCOL)
+                files['pickle'] = pickle_path
             
             # Save summary information
             summary_path = os.path.join(self.data_dir, f"{filename}_summary.json")
             
-            # Calculate statistics
-            depth_stats = {}
-            section_stats = {}
-            for doc in documents:
-                depth = doc.metadata.get('discovery_depth', 0)
-                section = doc.metadata.get('section', 'unknown')
-                depth_stats[depth] = depth_stats.get(depth, 0) + 1
-                section_stats[section] = section_stats.get(section, 0) + 1
-            
             summary = {
-                'total_documents': len(documents),
-                'total_characters': sum(len(doc.page_content) for doc in documents),
-                'average_chunk_size': sum(len(doc.page_content) for doc in documents) / len(documents) if documents else 0,
-                'source_urls_count': len(set(doc.metadata.get('source_url', '') for doc in documents)),
+                'total_documents': total_documents,
+                'total_characters': total_characters,
+                'average_chunk_size': total_characters / total_documents if total_documents else 0,
+                'source_urls_count': len(source_urls - {None, ''}),
                 'unique_sections': len(section_stats),
-                'depth_distribution': depth_stats,
-                'section_distribution': section_stats,
+                'depth_distribution': dict(depth_stats),
+                'section_distribution': dict(section_stats),
                 'discovery_stats': {
                     'max_depth': self.max_depth,
                     'max_pages': self.max_pages,
                     'total_discovered_urls': len(self.discovered_urls),
-                    'failed_urls': len(self.failed_urls)
+                    'failed_urls': len(self.failed_urls),
+                    'duplicate_pages_skipped': self.duplicate_pages
                 },
                 'created_at': datetime.now().isoformat(),
                 'files': {
-                    'pickle': pickle_path,
-                    'json': json_path,
+                    **files,
                     'summary': summary_path
                 }
             }
             
-            with open(summary_path, 'w') as f:
-                json.dump(summary, f, indent=2)
+            with open(summary_path, 'wb') as f:
+                f.write(_json_bytes(summary, indent=True))
             
             print(f"✓ Documents saved:")
-            print(f"  - Pickle: {pickle_path}")
-            print(f"  - JSON: {json_path}")
+            if 'parquet' in files:
+                print(f"  - Parquet: {files['parquet']}")
+            if 'pickle' in files:
+                print(f"  - Pickle: {files['pickle']}")
+            if 'json' in files:
+                print(f"  - JSON: {files['json']}")
             print(f"  - Summary: {summary_path}")
             
-            return pickle_path
+            return files.get('pickle') or files['parquet']
             
         except Exception as e:
             print(f"✗ Error saving documents: {str(e)}")
             raise
+        finally:
+            if parquet_writer is not None:
+                parquet_writer.close()
     
     def load_saved_documents(self, filename: str) -> List[Document]:
-        """Load previously saved documents from pickle file."""
+        """Load previously saved documents, preferring Parquet over the pickle export."""
+        parquet_path = os.path.join(self.data_dir, f"{filename}.parquet")
         pickle_path = os.path.join(self.data_dir, f"{filename}.pkl")
         
-        if not os.path.exists(pickle_path):
+        if pq is not None and os.path.exists(parquet_path):
+            path = parquet_path
+        elif os.path.exists(pickle_path):
+            path = pickle_path
+        else:
             raise FileNotFoundError(f"No saved documents found at {pickle_path}")
         
         try:
-            with open(pickle_path, 'rb') as f:
-                documents = pickle.load(f)
+            if path == parquet_path:
+                documents = list(iter_parquet_documents(path))
+            else:
+                with open(path, 'rb') as f:
+                    documents = pickle.load(f)
             
-            print(f"✓ Loaded {len(documents)} documents from {pickle_path}")
+            print(f"✓ Loaded {len(documents)} documents from {path}")
             return documents
             
         except Exception as e:
             print(f"✗ Error loading saved documents: {str(e)}")
             raise
     
-    def process_all(self, save_filename: str = None, discover_links: bool = True) -> List[Document]:
+    def process_all(self, save_filename: str = None, discover_links: bool = True,
+                    human_readable: bool = False) -> List[Document]:
         """Complete pipeline: discover links, load, split, and save documents."""
         print("🚀 === HMRC Document Processing Pipeline (Comprehensive) ===")
         print(f"📋 Configuration:")
@@ -412,7 +1129,7 @@ class HMRCDocumentLoader:
             chunks = self.split_documents(documents)
             
             # Save processed documents
-            saved_path = self.save_documents(chunks, save_filename)
+            saved_path = self.save_documents(chunks, save_filename, human_readable=human_readable)
             
             print(f"\n🎉 === Processing Complete ===")
             print(f"📊 Statistics:")
@@ -423,9 +1140,7 @@ class HMRCDocumentLoader:
             print(f"💾 Documents saved to: {saved_path}")
             
             # Print depth distribution
-            depth_stats = {}
-            for url, depth in self.discovered_urls.items():
-                depth_stats[depth] = depth_stats.get(depth, 0) + 1
+            depth_stats = Counter(self.discovered_urls.values())
             
             print(f"\n🌳 URL Distribution by Depth:")
             for depth in sorted(depth_stats.keys()):
@@ -439,85 +1154,58 @@ class HMRCDocumentLoader:
     
     def _extract_section_from_url(self, url: str) -> str:
         """Extract section identifier from HMRC URL."""
-        # Extract the specific section code from URL
-        if '/ersm' in url:
-            # Try to extract ERSM code (e.g., ersm110000, ersm20020, etc.)
-            match = re.search(r'/ersm(\d+)', url)
-            if match:
-                code = match.group(1)
-                return f'ersm{code}'
+        # Extract the specific ERSM code from URL (e.g., ersm110000, ersm20020, etc.)
+        match = _ERSM_CODE_RE.search(url)
+        if match:
+            return f'ersm{match.group(1)}'
         
         # Legacy mappings for broader categories
-        if 'ersm110000' in url or 'ersm11' in url:
-            return 'ersm110000_general_principles'
-        elif 'ersm20000' in url or 'ersm2' in url:
-            return 'ersm20000_share_schemes'
-        elif 'ersm30000' in url or 'ersm3' in url:
-            return 'ersm30000_tax_implications'
-        elif 'capital-gains' in url:
-            return 'capital_gains_manual'
-        elif 'income-tax' in url:
-            return 'income_tax_manual'
-        elif 'share-schemes' in url:
-            return 'share_schemes'
-        else:
-            # Extract from URL path
-            path_parts = url.split('/')[-2:]
-            return '_'.join(part for part in path_parts if part)
-    
-    def _extract_page_title(self, content: str) -> str:
-        """Extract page title from document content."""
-        lines = content.split('\n')[:10]  # Check first 10 lines
-        for line in lines:
-            line = line.strip()
-            if line and len(line) > 10 and len(line) < 200:
-                # Remove common prefixes
-                for prefix in ['ERSM', 'Employment-related securities', 'HMRC internal manual']:
-                    if line.startswith(prefix):
-                        line = line[len(prefix):].strip(' -:')
-                if line:
-                    return line
-        return 'Unknown'
+        for fragment, section in _LEGACY_SECTIONS:
+            if fragment in url:
+                return section
+        
+        # Extract from URL path
+        path_parts = url.split('/')[-2:]
+        return '_'.join(part for part in path_parts if part)
     
     def _save_discovered_urls(self) -> None:
         """Save discovered URLs information."""
         discovered_path = os.path.join(self.data_dir, f"discovered_urls_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
         
         try:
+            # Group URLs by depth
+            urls_by_depth = defaultdict(list)
+            for url, depth in self.discovered_urls.items():
+                urls_by_depth[str(depth)].append(url)
+            
             discovery_info = {
                 'discovered_at': datetime.now().isoformat(),
                 'total_urls': len(self.discovered_urls),
                 'max_depth': self.max_depth,
                 'max_pages': self.max_pages,
-                'urls_by_depth': {},
+                'urls_by_depth': dict(urls_by_depth),
                 'all_urls': self.discovered_urls
             }
             
-            # Group URLs by depth
-            for url, depth in self.discovered_urls.items():
-                if str(depth) not in discovery_info['urls_by_depth']:
-                    discovery_info['urls_by_depth'][str(depth)] = []
-                discovery_info['urls_by_depth'][str(depth)].append(url)
-            
-            with open(discovered_path, 'w') as f:
-                json.dump(discovery_info, f, indent=2)
+            # Batch scripts read this file, so never leave a half-written one behind
+            _write_atomic(discovered_path, _json_bytes(discovery_info, indent=True))
             
             print(f"📝 Discovered URLs saved to: {discovered_path}")
             
         except Exception as e:
             print(f"Could not save discovered URLs: {str(e)}")
     
-    def _save_failed_urls(self, failed_urls: List[Dict[str, Any]]) -> None:
+    def _save_failed_urls(self, failed_urls: List[FailedURL]) -> None:
         """Save information about failed URL loads."""
         failed_path = os.path.join(self.data_dir, f"failed_urls_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
         
         try:
-            with open(failed_path, 'w') as f:
-                json.dump({
+            with open(failed_path, 'wb') as f:
+                f.write(_json_bytes({
                     'failed_at': datetime.now().isoformat(),
                     'failed_count': len(failed_urls),
-                    'failed_urls': failed_urls
-                }, f, indent=2)
+                    'failed_urls': [failure._asdict() for failure in failed_urls]
+                }, indent=True))
             
             print(f"❌ Failed URL information saved to: {failed_path}")
             
@@ -534,27 +1222,27 @@ def main():
     parser.add_argument('--max-pages', type=int, default=1000, help='Maximum pages to crawl')
     parser.add_argument('--no-discovery', action='store_true', help='Disable link discovery')
     parser.add_argument('--data-dir', default='data', help='Data directory')
+    parser.add_argument('--human-readable', action='store_true', help='Also save chunks as a JSON array')
+    parser.add_argument('--verbose', action='store_true', help='Print a line per URL instead of progress bars')
     
     args = parser.parse_args()
     
     # Check dependencies
-    try:
-        from bs4 import BeautifulSoup
-        import requests
-    except ImportError:
+    if BeautifulSoup is None:
         print("❌ Missing required packages. Install with:")
-        print("   pip install beautifulsoup4 requests")
+        print("   pip install beautifulsoup4")
         return
     
     loader = HMRCDocumentLoader(
         data_dir=args.data_dir,
         max_depth=args.max_depth,
-        max_pages=args.max_pages
+        max_pages=args.max_pages,
+        verbose=args.verbose
     )
     
     try:
         # Process all documents
-        chunks = loader.process_all(discover_links=not args.no_discovery)
+        chunks = loader.process_all(discover_links=not args.no_discovery, human_readable=args.human_readable)
         
         # Display some sample chunks
         if chunks:
@@ -1,14 +1,265 @@
 import os
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import re
+import time
+import logging
+import sqlite3
+import hashlib
+import threading
+import urllib.request
+from types import MappingProxyType
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Tuple, Iterator
+from datetime import datetime, timezone
 
-from langchain.chains import RetrievalQA
-from langchain.schema import Document
-from langchain_community.llms import Ollama
-from langchain.prompts import PromptTemplate
+import numpy as np
+
+# Optional: faster JSON for answers persisted by SemanticAnswerCache
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    from json import dumps as json_dumps, loads as json_loads
+
+from langchain_core.documents import Document
 
 from vector_store import HMRCVectorStore
 
+logger = logging.getLogger(__name__)
+
+# Readable titles for the section identifiers stored in chunk metadata
+_SECTION_TITLES = MappingProxyType({
+    "ersm110000_general_principles": "ERSM110000 - General Principles",
+    "ersm20000_share_schemes": "ERSM20000 - Employment-related Securities and Options",
+    "ersm30000_tax_implications": "ERSM30000 - Restricted Securities"
+})
+
+
+def _best_match(E, q):
+    """Return (row, score) of the highest inner product between q and the rows of E."""
+    scores = E @ q
+    row = int(scores.argmax())
+    return row, scores[row]
+
+
+# Custom prompt template for HMRC equity advice
+_PROMPT_TEMPLATE = """You are an AI advisor specializing in UK EMPLOYMENT EQUITY COMPENSATION and HMRC regulations. Use the provided context from official HMRC documentation to answer questions about share options, EMI schemes, tax implications, and employment-related securities.
+
+INSTRUCTIONS:
+- Provide accurate, authoritative advice based ONLY on the HMRC context provided
+- Focus on UK-specific rules and regulations
+- Be confident and definitive in your responses
+- If the context doesn't contain enough information, say so clearly
+- Always cite the specific HMRC sections that support your answer
+- Format your response with clear headings and bullet points
+- EMI = Enterprise Management Incentives (NOT EML)
+
+Context from HMRC documentation:
+{context}
+
+Question: {question}
+
+Answer with clear structure:
+**Key Points**
+" [Main points from HMRC guidance]
+
+**HMRC Requirements**
+" [Specific regulatory requirements]
+
+**Tax Implications**
+" [Tax consequences and considerations]
+
+**Sources**
+" [Cite specific HMRC sections used]
+
+Answer:"""
+
+# Static pieces around the {context} and {question} slots, joined by plain concatenation per question
+_PROMPT_PREFIX, _rest = _PROMPT_TEMPLATE.split("{context}")
+_PROMPT_MIDDLE, _PROMPT_SUFFIX = _rest.split("{question}")
+del _rest
+
+# Small talk answered directly, without retrieval or the LLM (whole question must match)
+_SMALL_TALK_REPLIES = (
+    (re.compile(r"(hi|hello|hey|hiya|good (morning|afternoon|evening))( there)?", re.I),
+     "Hello! I can answer questions about UK employment-related securities, share schemes such as EMI, CSOP and SAYE, and their HMRC tax treatment. What would you like to know?"),
+    (re.compile(r"(thanks|thank you|thx|cheers)( (very|so) much)?", re.I),
+     "You're welcome! Let me know if you have any other questions about employee share schemes or HMRC rules."),
+    (re.compile(r"(who|what) are you", re.I),
+     "I'm an AI advisor for UK employment equity compensation, answering from official HMRC guidance on employment-related securities."),
+)
+
+_OUT_OF_DOMAIN_REPLY = (
+    "This question appears to be outside the HMRC employment-related securities knowledge base. "
+    "I can help with share options, EMI and other share schemes, and their UK tax implications."
+)
+
+
+class SemanticAnswerCache:
+    """Two-tier LRU cache of answers: exact normalized-question hits, then cosine-similar questions."""
+    
+    def __init__(self, max_size: int = 512, ttl: float = 3600, threshold: float = 0.95,
+                 path: Optional[str] = None):
+        """
+        Initialize the answer cache.
+        
+        Args:
+            max_size: Maximum number of cached answers before LRU eviction
+            ttl: Seconds a cached answer stays valid
+            threshold: Minimum cosine similarity for a semantic hit
+            path: SQLite file that persists answers across runs (None keeps them in memory only)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        
+        # key -> (matrix row, response, stored_at); order is least to most recently used
+        self._entries: "OrderedDict[str, Tuple[int, Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        
+        # Row i of E holds the (already L2-normalized) embedding of the question cached in slot i.
+        # Free rows are zero, so they score 0 and can never pass the threshold.
+        self.E: Optional[np.ndarray] = None
+        self._row_keys: List[Optional[str]] = [None] * max_size
+        self._free_rows = list(range(max_size - 1, -1, -1))
+        
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._conn: Optional[sqlite3.Connection] = None
+        if path and max_size > 0:
+            self._open(path)
+    
+    def _open(self, path: str):
+        """Open the SQLite store and load the answers that are still fresh."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Shared with daemon worker threads; every statement runs under self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, embedding BLOB NOT NULL, response TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM answers WHERE stored_at < ?", (time.time() - self.ttl,))
+        self._conn.commit()
+        
+        rows = self._conn.execute(
+            "SELECT key, embedding, response, stored_at FROM answers ORDER BY stored_at DESC LIMIT ?",
+            (self.max_size,)
+        ).fetchall()
+        for key, embedding, response, stored_at in reversed(rows):
+            self._insert(key, np.frombuffer(embedding, dtype=np.float32), json_loads(response), stored_at)
+    
+    @staticmethod
+    def _key(question: str) -> str:
+        normalized = ' '.join(question.lower().split()).rstrip('?!. ')
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    
+    def _evict(self, key: str):
+        row, _, _ = self._entries.pop(key)
+        self.E[row] = 0.0
+        self._row_keys[row] = None
+        self._free_rows.append(row)
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+            self._conn.commit()
+    
+    def _insert(self, key: str, embedding: np.ndarray, response: Dict[str, Any], stored_at: float):
+        if self.E is None:
+            self.E = np.zeros((self.max_size, embedding.shape[0]), dtype=np.float32)
+        if key in self._entries:
+            self._evict(key)
+        while not self._free_rows:
+            self._evict(next(iter(self._entries)))
+            self.evictions += 1
+        row = self._free_rows.pop()
+        self.E[row] = embedding
+        self._row_keys[row] = key
+        self._entries[key] = (row, response, stored_at)
+    
+    def _hit(self, key: str) -> Optional[Dict[str, Any]]:
+        _, response, stored_at = self._entries[key]
+        if time.time() - stored_at > self.ttl:
+            self._evict(key)
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return response
+    
+    def lookup(self, question: str,
+               embed: Callable[[str], List[float]]) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+        """
+        Look up a cached answer for a question.
+        
+        Args:
+            question: The question being asked
+            embed: Function returning the normalized embedding of a text
+            
+        Returns:
+            (cached response or None, question embedding or None if not computed)
+        """
+        key = self._key(question)
+        with self._lock:
+            if key in self._entries:
+                response = self._hit(key)
+                if response is not None:
+                    self.hits += 1
+                    return response, None
+        
+        # Embed outside the lock; it is the slow part and touches no shared state
+        q = np.asarray(embed(question), dtype=np.float32)
+        
+        with self._lock:
+            if self._entries:
+                row, score = _best_match(self.E, q)
+                if score >= self.threshold:
+                    response = self._hit(self._row_keys[row])
+                    if response is not None:
+                        self.hits += 1
+                        self.semantic_hits += 1
+                        return response, q
+            self.misses += 1
+        return None, q
+    
+    def put(self, question: str, embedding: List[float], response: Dict[str, Any]):
+        """Cache a response under the question text and its embedding."""
+        if self.max_size <= 0:
+            return
+        embedding = np.asarray(embedding, dtype=np.float32)
+        key = self._key(question)
+        stored_at = time.time()
+        with self._lock:
+            self._insert(key, embedding, response, stored_at)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answers (key, embedding, response, stored_at) VALUES (?, ?, ?, ?)",
+                    (key, embedding.tobytes(), json_dumps(response), stored_at)
+                )
+                self._conn.commit()
+    
+    def clear(self):
+        """Drop all cached answers."""
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
 
 class HMRCRetriever:
     """RAG retriever for HMRC employment-related securities using Chroma vector store and Ollama LLM."""
@@ -18,7 +269,14 @@ class HMRCRetriever:
                  model_name: str = "llama3.2",
                  vector_store_dir: str = ".chromadb",
                  collection_name: str = "hmrc_employment_securities",
-                 k: int = 5):
+                 vector_store_backend: str = "chroma",
+                 vector_store: Optional[HMRCVectorStore] = None,
+                 k: int = 5,
+                 cache_size: int = 512,
+                 cache_ttl: float = 3600,
+                 cache_threshold: float = 0.95,
+                 cache_path: Optional[str] = None,
+                 min_relevance: Optional[float] = None):
         """
         Initialize the RAG retriever.
         
@@ -27,14 +285,25 @@ class HMRCRetriever:
             model_name: Ollama model name
             vector_store_dir: Directory containing Chroma database
             collection_name: Chroma collection name
+            vector_store_backend: "chroma" or "faiss" (see HMRCVectorStore)
+            vector_store: Already-open vector store to share, so its embedding model is not loaded
+                          a second time (vector_store_dir, collection_name and backend are then unused)
             k: Number of documents to retrieve for context
+            cache_size: Maximum number of cached answers (0 disables the answer cache)
+            cache_ttl: Seconds a cached answer stays valid
+            cache_threshold: Minimum cosine similarity to reuse an answer for a paraphrased question
+            cache_path: SQLite file that keeps cached answers across runs (None keeps them in memory)
+            min_relevance: Questions whose best chunk is less cosine-similar than this get a canned
+                           out-of-domain reply instead of an LLM call (None, the default, disables the check)
         """
         self.ollama_base_url = ollama_base_url
         self.model_name = model_name
         self.k = k
+        self.min_relevance = min_relevance
         
-        # Initialize Ollama LLM
-        print(f"Connecting to Ollama at {ollama_base_url} with model {model_name}")
+        # Initialize Ollama LLM; imported here so check_ollama stays cheap to import
+        from langchain_community.llms import Ollama
+        logger.info("Connecting to Ollama at %s with model %s", ollama_base_url, model_name)
         self.llm = Ollama(
             base_url=ollama_base_url,
             model=model_name,
@@ -43,70 +312,131 @@ class HMRCRetriever:
         )
         
         # Initialize vector store
-        print("Loading vector store...")
-        self.vector_store_manager = HMRCVectorStore(
-            persist_directory=vector_store_dir,
-            collection_name=collection_name
-        )
+        if vector_store is not None:
+            self.vector_store_manager = vector_store
+        else:
+            logger.info("Loading vector store...")
+            self.vector_store_manager = HMRCVectorStore(
+                persist_directory=vector_store_dir,
+                collection_name=collection_name,
+                backend=vector_store_backend
+            )
+        
+        # QA prompt (kept for introspection; questions are built from the pre-split constants)
+        self.prompt_template = _PROMPT_TEMPLATE
         
-        # Get the retriever from vector store
-        self.retriever = self.vector_store_manager.vector_store.as_retriever(
-            search_kwargs={"k": k}
+        # Answer cache in front of the QA chain
+        self.answer_cache = SemanticAnswerCache(
+            max_size=cache_size,
+            ttl=cache_ttl,
+            threshold=cache_threshold,
+            path=cache_path
         )
         
-        # Initialize QA chain
-        self._setup_qa_chain()
+        logger.info(" RAG retriever initialized successfully")
+    
+    @staticmethod
+    def _build_prompt(question: str, documents: List[Document]) -> str:
+        """Stuff the retrieved documents and the question into the QA prompt."""
+        context = "\n\n".join(doc.page_content for doc in documents)
+        return _PROMPT_PREFIX + context + _PROMPT_MIDDLE + question + _PROMPT_SUFFIX
+    
+    def _direct_response(self, question: str, answer: str, path: str, timestamp: str) -> Dict[str, Any]:
+        """Build a response that needed no retrieval and no LLM call."""
+        return {
+            "answer": answer,
+            "sources": [],
+            "metadata": {
+                "question": question,
+                "num_sources": 0,
+                "model_used": None,
+                "timestamp": timestamp,
+                "retrieval_k": self.k,
+                "mfee_path": path
+            }
+        }
+    
+    def _small_talk_answer(self, question: str, timestamp: str) -> Optional[Dict[str, Any]]:
+        """Answer greetings, thanks and identity questions directly."""
+        text = question.strip().rstrip("!?. ")
+        for pattern, reply in _SMALL_TALK_REPLIES:
+            if pattern.fullmatch(text):
+                logger.info(" Small talk answered directly")
+                return self._direct_response(question, reply, "direct_small_talk", timestamp)
+        return None
+    
+    def _cached_answer(self, question: str, timestamp: str) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]]]:
+        """Probe the answer cache; returns (cached response or None, question embedding)."""
+        embedding = None
+        if self.answer_cache.max_size > 0:
+            cached, embedding = self.answer_cache.lookup(
+                question, self.vector_store_manager.embeddings.embed_query
+            )
+            if cached is not None:
+                logger.info(" Answer served from cache")
+                return {
+                    **cached,
+                    "metadata": {**cached["metadata"], "question": question, "timestamp": timestamp,
+                                 "cache_hit": True, "mfee_path": "cache"}
+                }, None
         
-        print(" RAG retriever initialized successfully")
+        # Embed the question once; the same vector served the cache probe above
+        if embedding is None:
+            embedding = self.vector_store_manager.embeddings.embed_query(question)
+        return None, embedding
     
-    def _setup_qa_chain(self):
-        """Setup the RetrievalQA chain with custom prompt."""
+    def _retrieve(self, embedding: List[float]) -> Tuple[List[Document], float]:
+        """Retrieve the context documents for a question embedding, plus the best cosine similarity."""
+        results = self.vector_store_manager.similarity_search_by_vector_with_scores(embedding, k=self.k)
         
-        # Custom prompt template for HMRC equity advice
-        prompt_template = """You are an AI advisor specializing in UK EMPLOYMENT EQUITY COMPENSATION and HMRC regulations. Use the provided context from official HMRC documentation to answer questions about share options, EMI schemes, tax implications, and employment-related securities.
-
-INSTRUCTIONS:
-- Provide accurate, authoritative advice based ONLY on the HMRC context provided
-- Focus on UK-specific rules and regulations
-- Be confident and definitive in your responses
-- If the context doesn't contain enough information, say so clearly
-- Always cite the specific HMRC sections that support your answer
-- Format your response with clear headings and bullet points
-- EMI = Enterprise Management Incentives (NOT EML)
-
-Context from HMRC documentation:
-{context}
-
-Question: {question}
-
-Answer with clear structure:
-**Key Points**
-" [Main points from HMRC guidance]
-
-**HMRC Requirements**
-" [Specific regulatory requirements]
-
-**Tax Implications**
-" [Tax consequences and considerations]
-
-**Sources**
-" [Cite specific HMRC sections used]
-
-Answer:"""
-
-        self.prompt = PromptTemplate(
-            template=prompt_template,
-            input_variables=["context", "question"]
+        # Scores are squared L2 distances between unit vectors: cosine = 1 - d / 2
+        best_similarity = max((1.0 - score / 2.0 for _, score in results), default=-1.0)
+        return [doc for doc, _ in results], best_similarity
+    
+    def _out_of_domain_answer(self, question: str, best_similarity: float, timestamp: str) -> Optional[Dict[str, Any]]:
+        """Answer directly when nothing in the corpus is relevant to the question."""
+        if self.min_relevance is None or best_similarity >= self.min_relevance:
+            return None
+        logger.info(" Question outside the knowledge base (best similarity %.2f)", best_similarity)
+        return self._direct_response(question, _OUT_OF_DOMAIN_REPLY, "direct_out_of_domain", timestamp)
+    
+    def _finish_answer(self,
+                       question: str,
+                       answer: str,
+                       source_documents: List[Document],
+                       embedding: List[float],
+                       timestamp: str) -> Dict[str, Any]:
+        """Format a generated answer with citations and cache it."""
+        formatted_response = self._format_response_with_citations(
+            answer=answer,
+            source_documents=source_documents,
+            question=question,
+            timestamp=timestamp
         )
         
-        # Create RetrievalQA chain
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=self.retriever,
-            chain_type_kwargs={"prompt": self.prompt},
-            return_source_documents=True
-        )
+        formatted_response["metadata"]["mfee_path"] = "rag"
+        
+        if self.answer_cache.max_size > 0:
+            self.answer_cache.put(question, embedding, formatted_response)
+        
+        return formatted_response
+    
+    @staticmethod
+    def _error_response(error: Exception, timestamp: str) -> Dict[str, Any]:
+        return {
+            "answer": f"I apologize, but I encountered an error while processing your question: {str(error)}",
+            "sources": [],
+            "metadata": {
+                "error": str(error),
+                "timestamp": timestamp
+            }
+        }
+    
+    @staticmethod
+    def _with_latency(response: Dict[str, Any], started_ns: int) -> Dict[str, Any]:
+        """Copy a response with the request's wall time; cached entries stay untouched."""
+        latency_ms = (time.perf_counter_ns() - started_ns) // 1_000_000
+        return {**response, "metadata": {**response["metadata"], "latency_ms": latency_ms}}
     
     def ask_question(self, question: str) -> Dict[str, Any]:
         """
@@ -118,59 +448,100 @@ Answer:"""
         Returns:
             Dictionary containing answer, sources, and metadata
         """
+        # One clock reading per request, shared by every response path
+        started_ns = time.perf_counter_ns()
+        timestamp = datetime.now(timezone.utc).isoformat()
+        try:
+            logger.info("Processing question: %s", question)
+            
+            response = self._small_talk_answer(question, timestamp)
+            embedding = None
+            if response is None:
+                response, embedding = self._cached_answer(question, timestamp)
+            if response is None:
+                # Retrieve context and generate the answer
+                source_documents, best_similarity = self._retrieve(embedding)
+                response = self._out_of_domain_answer(question, best_similarity, timestamp)
+            if response is None:
+                answer = self.llm.invoke(self._build_prompt(question, source_documents))
+                
+                # Format response with citations
+                response = self._finish_answer(question, answer, source_documents, embedding, timestamp)
+            
+        except Exception as e:
+            logger.error(" Error processing question: %s", e)
+            response = self._error_response(e, timestamp)
+        
+        return self._with_latency(response, started_ns)
+    
+    def ask_question_stream(self, question: str) -> Iterator[Dict[str, Any]]:
+        """
+        Ask a question and stream the answer as it is generated.
+        
+        Args:
+            question: The question to ask
+            
+        Yields:
+            {"delta": text} for each generated fragment, then the complete
+            response (as returned by ask_question) with "done": True
+        """
+        started_ns = time.perf_counter_ns()
+        timestamp = datetime.now(timezone.utc).isoformat()
         try:
-            print(f"Processing question: {question}")
+            logger.info("Processing question (streaming): %s", question)
             
-            # Get answer from QA chain
-            result = self.qa_chain({"query": question})
+            response = self._small_talk_answer(question, timestamp)
+            embedding = None
+            if response is None:
+                response, embedding = self._cached_answer(question, timestamp)
+            if response is None:
+                source_documents, best_similarity = self._retrieve(embedding)
+                response = self._out_of_domain_answer(question, best_similarity, timestamp)
             
-            # Extract information
-            answer = result["result"]
-            source_documents = result["source_documents"]
+            # Direct and cached answers arrive whole, as a single delta
+            if response is not None:
+                yield {"delta": response["answer"]}
+                yield {**self._with_latency(response, started_ns), "done": True}
+                return
             
-            # Format response with citations
-            formatted_response = self._format_response_with_citations(
-                answer=answer,
-                source_documents=source_documents,
-                question=question
-            )
+            fragments = []
+            for fragment in self.llm.stream(self._build_prompt(question, source_documents)):
+                fragments.append(fragment)
+                yield {"delta": fragment}
             
-            return formatted_response
+            response = self._finish_answer(question, "".join(fragments), source_documents, embedding, timestamp)
+            yield {**self._with_latency(response, started_ns), "done": True}
             
         except Exception as e:
-            print(f" Error processing question: {str(e)}")
-            return {
-                "answer": f"I apologize, but I encountered an error while processing your question: {str(e)}",
-                "sources": [],
-                "metadata": {
-                    "error": str(e),
-                    "timestamp": datetime.now().isoformat()
-                }
-            }
+            logger.error(" Error processing question: %s", e)
+            yield {**self._with_latency(self._error_response(e, timestamp), started_ns), "done": True}
     
     def _format_response_with_citations(self, 
                                       answer: str, 
                                       source_documents: List[Document],
-                                      question: str) -> Dict[str, Any]:
+                                      question: str,
+                                      timestamp: str) -> Dict[str, Any]:
         """Format the response with proper citations and metadata."""
         
-        # Extract unique sources
-        sources = []
-        seen_sources = set()
+        # Extract unique sources (dicts keep first-seen order)
+        sources_map: Dict[str, Dict[str, str]] = {}
         
         for doc in source_documents:
             source_url = doc.metadata.get('source_url', 'Unknown')
             section = doc.metadata.get('section', 'Unknown')
             
             source_key = f"{source_url}#{section}"
-            if source_key not in seen_sources:
-                sources.append({
+            if source_key not in sources_map:
+                content = doc.page_content
+                snippet = content[:200]
+                sources_map[source_key] = {
                     'url': source_url,
                     'section': section,
                     'section_title': self._get_section_title(section),
-                    'snippet': doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content
-                })
-                seen_sources.add(source_key)
+                    'snippet': snippet + "..." if len(content) > 200 else snippet
+                }
+        
+        sources = list(sources_map.values())
         
         # Add source citations to answer if not already present
         if sources and "**Sources**" not in answer:
@@ -185,19 +556,29 @@ Answer:"""
                 "question": question,
                 "num_sources": len(sources),
                 "model_used": self.model_name,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp,
                 "retrieval_k": self.k
             }
         }
     
-    def _get_section_title(self, section: str) -> str:
+    @staticmethod
+    def _get_section_title(section: str) -> str:
         """Convert section identifier to readable title."""
-        section_titles = {
-            "ersm110000_general_principles": "ERSM110000 - General Principles",
-            "ersm20000_share_schemes": "ERSM20000 - Employment-related Securities and Options",
-            "ersm30000_tax_implications": "ERSM30000 - Restricted Securities"
-        }
-        return section_titles.get(section, section)
+        return _SECTION_TITLES.get(section, section)
+    
+    @staticmethod
+    def _format_search_results(results: List[Tuple[Document, float]]) -> List[Dict[str, Any]]:
+        """Convert (document, score) pairs into JSON-friendly search results."""
+        return [
+            {
+                'content': doc.page_content,
+                'score': score,
+                'metadata': doc.metadata,
+                'source_url': doc.metadata.get('source_url', 'Unknown'),
+                'section': doc.metadata.get('section', 'Unknown')
+            }
+            for doc, score in results
+        ]
     
     def search_similar_documents(self, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
         """
@@ -216,22 +597,36 @@ Answer:"""
             # Use vector store's similarity search with scores
             results = self.vector_store_manager.similarity_search_with_scores(query, k=search_k)
             
-            formatted_results = []
-            for doc, score in results:
-                formatted_results.append({
-                    'content': doc.page_content,
-                    'score': score,
-                    'metadata': doc.metadata,
-                    'source_url': doc.metadata.get('source_url', 'Unknown'),
-                    'section': doc.metadata.get('section', 'Unknown')
-                })
-            
-            return formatted_results
+            return self._format_search_results(results)
             
         except Exception as e:
-            print(f" Error searching documents: {str(e)}")
+            logger.error(" Error searching documents: %s", e)
             return []
     
+    def search_similar_documents_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar documents for several queries in one embedding batch.
+        
+        Args:
+            queries: Search queries
+            k: Number of documents to return per query (defaults to self.k)
+            
+        Returns:
+            One list of similar documents per query
+        """
+        try:
+            search_k = k or self.k
+            batch_results = self.vector_store_manager.batch_similarity_search(queries, k=search_k)
+            return [self._format_search_results(results) for results in batch_results]
+            
+        except Exception as e:
+            logger.error(" Error searching documents: %s", e)
+            return [[] for _ in queries]
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get answer cache hit/miss/eviction statistics."""
+        return self.answer_cache.get_stats()
+    
     def get_retriever_info(self) -> Dict[str, Any]:
         """Get information about the retriever configuration."""
         vector_info = self.vector_store_manager.get_collection_info()
@@ -241,39 +636,84 @@ Answer:"""
             "model_name": self.model_name,
             "retrieval_k": self.k,
             "vector_store_info": vector_info,
-            "prompt_template": self.prompt.template if hasattr(self, 'prompt') else None
+            "prompt_template": getattr(self, 'prompt_template', None)
         }
     
-    def test_connection(self) -> Dict[str, bool]:
-        """Test connections to Ollama and vector store."""
+    @staticmethod
+    def check_ollama(ollama_base_url: str = "http://localhost:11434",
+                     model_name: str = "llama3.2",
+                     timeout: float = 2.0) -> Dict[str, bool]:
+        """
+        Cheap Ollama check: list the local models over HTTP, without loading or running one.
+        
+        Args:
+            ollama_base_url: Ollama server URL
+            model_name: Model expected to be pulled (an untagged name matches any tag)
+            timeout: Seconds to wait for the server
+            
+        Returns:
+            {"ollama_reachable": bool, "model_available": bool}
+        """
+        results = {"ollama_reachable": False, "model_available": False}
+        try:
+            with urllib.request.urlopen(f"{ollama_base_url.rstrip('/')}/api/tags", timeout=timeout) as response:
+                models = json_loads(response.read()).get("models", [])
+        except Exception as e:
+            logger.error(" Ollama not reachable: %s", e)
+            return results
+        
+        results["ollama_reachable"] = True
+        names = {model.get("name", "") for model in models}
+        results["model_available"] = any(model_name in (name, name.split(":")[0]) for name in names)
+        return results
+    
+    def _ping_ollama(self) -> bool:
+        """Ask Ollama for a single token to check it is reachable."""
+        return bool(self.llm.invoke("Hi", num_predict=1))
+    
+    def test_connection(self, timeout: float = 30.0) -> Dict[str, bool]:
+        """Test connections to Ollama and vector store (probed concurrently)."""
         results = {
             "ollama_connected": False,
             "vector_store_loaded": False,
             "documents_available": False
         }
         
-        try:
-            # Test Ollama connection
-            test_response = self.llm("Hello")
-            results["ollama_connected"] = bool(test_response)
-            print(" Ollama connection successful")
-        except Exception as e:
-            print(f" Ollama connection failed: {str(e)}")
+        # The Ollama round-trip dominates; run the vector store count alongside it
+        executor = ThreadPoolExecutor(max_workers=2)
+        ollama_future = executor.submit(self._ping_ollama)
+        count_future = executor.submit(self.vector_store_manager.get_document_count)
         
         try:
-            # Test vector store
-            doc_count = self.vector_store_manager.get_document_count()
-            results["vector_store_loaded"] = True
-            results["documents_available"] = doc_count > 0
-            print(f" Vector store loaded with {doc_count} documents")
-        except Exception as e:
-            print(f" Vector store test failed: {str(e)}")
+            try:
+                # Test Ollama connection
+                results["ollama_connected"] = ollama_future.result(timeout=timeout)
+                logger.info(" Ollama connection successful")
+            except TimeoutError:
+                logger.error(" Ollama connection failed: no response within %ss", timeout)
+            except Exception as e:
+                logger.error(" Ollama connection failed: %s", e)
+            
+            try:
+                # Test vector store
+                doc_count = count_future.result(timeout=timeout)
+                results["vector_store_loaded"] = True
+                results["documents_available"] = doc_count > 0
+                logger.info(" Vector store loaded with %s documents", doc_count)
+            except TimeoutError:
+                logger.error(" Vector store test failed: no response within %ss", timeout)
+            except Exception as e:
+                logger.error(" Vector store test failed: %s", e)
+        finally:
+            # Don't wait on a probe that timed out
+            executor.shutdown(wait=False)
         
         return results
 
 
 def main():
     """Example usage of the HMRC RAG retriever."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
     try:
         # Initialize retriever
@@ -1,12 +1,175 @@
 import os
 import json
+import uuid
+import logging
 import pickle
-from typing import List, Dict, Any, Optional, Tuple
+import sqlite3
+import hashlib
+from itertools import islice
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 from datetime import datetime
 
-from langchain_chroma import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.schema import Document
+import numpy as np
+import chromadb
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Optional: in-process exact-search backend for small corpora
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Optional: faster JSON encoding for the collection info file
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default_embedding_device() -> str:
+    """Pick the fastest available device for the embedding model."""
+    # Optional: torch is only used here to pick an accelerator, and is slow to import
+    try:
+        import torch
+    except ImportError:
+        return 'cpu'
+    if torch.cuda.is_available():
+        return 'cuda'
+    mps = getattr(torch.backends, 'mps', None)
+    if mps is not None and mps.is_available():
+        return 'mps'
+    return 'cpu'
+
+
+# Document file formats written by HMRCDocumentLoader.save_documents
+DOCUMENT_FILE_EXTENSIONS = ('.parquet', '.pkl')
+
+
+class _FAISSIndex:
+    """Exact inner-product FAISS index over normalized embeddings, with the documents kept alongside."""
+    
+    def __init__(self, persist_directory: str, collection_name: str, quantize: bool = False):
+        self.quantize = quantize
+        self.index_path = os.path.join(persist_directory, f"{collection_name}.faiss")
+        self.docs_path = os.path.join(persist_directory, f"{collection_name}.docs.pkl")
+        self.index = None
+        self.docs: List[Document] = []
+        
+        if os.path.exists(self.index_path) and os.path.exists(self.docs_path):
+            self.index = faiss.read_index(self.index_path)
+            with open(self.docs_path, 'rb') as f:
+                self.docs = pickle.load(f)
+    
+    def count(self) -> int:
+        return len(self.docs)
+    
+    def add(self, documents: List[Document], embeddings: List[List[float]]) -> List[str]:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if self.index is None:
+            if self.quantize:
+                # int8 scalar quantization: 4x smaller vectors. Embeddings are unit-normalized,
+                # so every component lies in [-1, 1]; training on those bounds alone fixes the
+                # range instead of clamping later batches to the first batch's min/max
+                self.index = faiss.IndexScalarQuantizer(
+                    vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+                )
+                bounds = np.repeat(np.array([[-1.0], [1.0]], dtype=np.float32), vectors.shape[1], axis=1)
+                self.index.train(bounds)
+            else:
+                self.index = faiss.IndexFlatIP(vectors.shape[1])
+        
+        start = len(self.docs)
+        self.index.add(vectors)
+        self.docs.extend(documents)
+        return [str(i) for i in range(start, len(self.docs))]
+    
+    def search(self, query_embeddings: List[List[float]], k: int) -> List[List[Tuple[Document, float]]]:
+        if self.index is None or not self.docs:
+            return [[] for _ in query_embeddings]
+        
+        scores, indices = self.index.search(np.asarray(query_embeddings, dtype=np.float32), min(k, len(self.docs)))
+        
+        # Report squared L2 distance (2 - 2*cosine for unit vectors) so scores match Chroma's default space
+        return [
+            [(self.docs[i], float(2.0 - 2.0 * score)) for score, i in zip(row_scores, row_indices) if i >= 0]
+            for row_scores, row_indices in zip(scores, indices)
+        ]
+    
+    def save(self):
+        if self.index is None:
+            return
+        faiss.write_index(self.index, self.index_path)
+        with open(self.docs_path, 'wb') as f:
+            pickle.dump(self.docs, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    def reset(self):
+        self.index = None
+        self.docs = []
+        for path in (self.index_path, self.docs_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class EmbeddingCache:
+    """SQLite-backed cache of document embeddings keyed by model name and content hash."""
+    
+    # Stay under SQLite's bound-parameter limit for IN (...) lookups
+    _LOOKUP_BATCH = 900
+    
+    def __init__(self, path: str = ".embcache/embeddings.sqlite"):
+        """
+        Initialize the embedding cache.
+        
+        Args:
+            path: SQLite file holding the cached vectors
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for whichever of the hashes are present."""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), self._LOOKUP_BATCH):
+            batch = unique[start:start + self._LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                [model, *batch]
+            )
+            for content_hash, vector in rows:
+                found[content_hash] = np.frombuffer(vector, dtype=np.float32)
+        return found
+    
+    def put_many(self, model: str, vectors: Dict[str, List[float]]):
+        """Store vectors keyed by content hash."""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+            [
+                (model, content_hash, np.asarray(vector, dtype=np.float32).tobytes())
+                for content_hash, vector in vectors.items()
+            ]
+        )
+        self._conn.commit()
+    
+    def close(self):
+        self._conn.close()
 
 
 class HMRCVectorStore:
@@ -15,7 +178,16 @@ class HMRCVectorStore:
     def __init__(self, 
                  persist_directory: str = ".chromadb",
                  embedding_model: str = "all-MiniLM-L6-v2",
-                 collection_name: str = "hmrc_employment_securities"):
+                 collection_name: str = "hmrc_employment_securities",
+                 backend: str = "chroma",
+                 embedding_cache_path: Optional[str] = ".embcache/embeddings.sqlite",
+                 device: Optional[str] = None,
+                 embedding_batch_size: int = 64,
+                 use_onnx: bool = False,
+                 quantize: bool = False,
+                 hnsw_m: int = 16,
+                 hnsw_construction_ef: int = 200,
+                 hnsw_search_ef: int = 100):
         """
         Initialize the vector store.
         
@@ -23,96 +195,257 @@ class HMRCVectorStore:
             persist_directory: Directory to store the Chroma database
             embedding_model: HuggingFace embedding model name
             collection_name: Name of the Chroma collection
+            backend: "chroma" (HNSW, persistent) or "faiss" (exact in-process search, for small corpora)
+            embedding_cache_path: SQLite file caching document embeddings across rebuilds (None disables)
+            device: Embedding device ("cuda", "mps", "cpu"); autodetected when None
+            embedding_batch_size: Number of texts encoded per forward pass
+            use_onnx: Run the embedding model through ONNX Runtime on CPU (needs sentence-transformers[onnx])
+            quantize: Store int8 scalar-quantized vectors (FAISS backend only)
+            hnsw_m: Graph links per node in Chroma's HNSW index
+            hnsw_construction_ef: Candidate list size while inserting (higher builds a better graph)
+            hnsw_search_ef: Candidate list size while querying (higher trades latency for recall)
+            
+        The HNSW parameters only take effect when the Chroma collection is created;
+        an existing collection keeps the values it was built with.
         """
+        if backend not in ("chroma", "faiss"):
+            raise ValueError(f"Unknown vector store backend: {backend}")
+        if backend == "faiss" and faiss is None:
+            raise ImportError("The FAISS backend requires faiss: pip install faiss-cpu")
+        if quantize and backend != "faiss":
+            raise ValueError("Vector quantization is only supported by the FAISS backend")
+        
         self.persist_directory = persist_directory
         self.collection_name = collection_name
+        self.backend = backend
+        self.quantize = quantize
+        self.embedding_model = embedding_model
+        
+        # Chroma's default space ("l2") is kept: scores are squared L2 between unit vectors,
+        # which the retriever and the FAISS backend both rely on
+        self.collection_metadata = {
+            "hnsw:M": hnsw_m,
+            "hnsw:construction_ef": hnsw_construction_ef,
+            "hnsw:search_ef": hnsw_search_ef
+        }
+        # Opened on first use (see embedding_cache), so query-only users never create the file
+        self.embedding_cache_path = embedding_cache_path
+        self._embedding_cache: Optional[EmbeddingCache] = None
         
         # Initialize HuggingFace embeddings
-        print(f"Loading embedding model: {embedding_model}")
+        self.device = device or _default_embedding_device()
+        model_kwargs = {'device': self.device}
+        if use_onnx and self.device == 'cpu':
+            model_kwargs['backend'] = 'onnx'
+        
+        logger.info("Loading embedding model: %s (%s%s)", embedding_model, self.device, ', onnx' if 'backend' in model_kwargs else '')
+        # LangChain integrations are imported on first use, so the static file and count
+        # helpers stay cheap to import for health checks
+        from langchain_community.embeddings import HuggingFaceEmbeddings
         self.embeddings = HuggingFaceEmbeddings(
             model_name=embedding_model,
-            model_kwargs={'device': 'cpu'},  # Use CPU for compatibility
-            encode_kwargs={'normalize_embeddings': True}
+            model_kwargs=model_kwargs,
+            encode_kwargs={'normalize_embeddings': True, 'batch_size': embedding_batch_size}
         )
         
         # Ensure persist directory exists
         os.makedirs(persist_directory, exist_ok=True)
         
-        # Initialize Chroma vector store
+        # Initialize vector store
         self.vector_store = None
+        self.faiss_index = None
         self._initialize_vector_store()
     
     def _initialize_vector_store(self):
-        """Initialize or load existing Chroma vector store."""
+        """Initialize or load existing vector store."""
         try:
-            self.vector_store = Chroma(
-                collection_name=self.collection_name,
-                embedding_function=self.embeddings,
-                persist_directory=self.persist_directory
-            )
+            if self.backend == "faiss":
+                self.faiss_index = _FAISSIndex(self.persist_directory, self.collection_name, quantize=self.quantize)
+            else:
+                from langchain_chroma import Chroma
+                self.vector_store = Chroma(
+                    collection_name=self.collection_name,
+                    embedding_function=self.embeddings,
+                    persist_directory=self.persist_directory,
+                    collection_metadata=self.collection_metadata
+                )
             
             # Check if collection exists and has documents
             collection_count = self.get_document_count()
             if collection_count > 0:
-                print(f" Connected to existing vector store with {collection_count} documents")
+                logger.info(" Connected to existing vector store with %s documents", collection_count)
             else:
-                print(" Initialized new empty vector store")
+                logger.info(" Initialized new empty vector store")
                 
         except Exception as e:
-            print(f" Error initializing vector store: {str(e)}")
+            logger.error(" Error initializing vector store: %s", e)
             raise
     
-    def load_documents_from_file(self, filepath: str) -> List[Document]:
-        """Load processed documents from pickle file."""
+    def iter_documents_from_file(self, filepath: str, batch_size: int = 256) -> Iterator[Document]:
+        """
+        Yield processed documents from a Parquet or pickle file.
+        
+        Parquet files are memory-mapped and decoded one record batch at a time,
+        so only the rows currently being consumed are materialized.
+        
+        Args:
+            filepath: Path to a .parquet or .pkl document file
+            batch_size: Rows decoded per Parquet record batch
+        """
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Document file not found: {filepath}")
         
-        try:
+        if filepath.endswith('.parquet'):
+            from document_loader import iter_parquet_documents
+            yield from iter_parquet_documents(filepath, batch_size)
+        else:
             with open(filepath, 'rb') as f:
-                documents = pickle.load(f)
+                yield from pickle.load(f)
+    
+    def load_documents_from_file(self, filepath: str) -> List[Document]:
+        """Load processed documents from a Parquet or pickle file."""
+        try:
+            documents = list(self.iter_documents_from_file(filepath))
             
-            print(f" Loaded {len(documents)} documents from {filepath}")
+            logger.info(" Loaded %s documents from %s", len(documents), filepath)
             return documents
             
         except Exception as e:
-            print(f" Error loading documents: {str(e)}")
+            logger.error(" Error loading documents: %s", e)
             raise
     
-    def find_latest_document_file(self, data_dir: str = "data") -> str:
+    @staticmethod
+    def find_latest_document_file(data_dir: str = "data") -> str:
         """Find the most recent HMRC document file in the data directory."""
         if not os.path.exists(data_dir):
             raise FileNotFoundError(f"Data directory not found: {data_dir}")
         
-        # Look for HMRC document pickle files
-        hmrc_files = [f for f in os.listdir(data_dir) if f.startswith('hmrc_docs_') and f.endswith('.pkl')]
+        # Look for HMRC document files (Parquet, or legacy pickle) in one directory pass
+        with os.scandir(data_dir) as entries:
+            hmrc_files = {
+                entry.name: entry for entry in entries
+                if entry.name.startswith('hmrc_docs_') and entry.name.endswith(DOCUMENT_FILE_EXTENSIONS)
+                and entry.is_file()
+            }
         
-        if not hmrc_files:
+        # Latest by modification time, preferring the Parquet copy when a save produced both formats
+        latest = max(hmrc_files.values(), key=lambda entry: entry.stat().st_mtime, default=None)
+        if latest is None:
             raise FileNotFoundError(f"No HMRC document files found in {data_dir}")
         
-        # Sort by filename (which includes timestamp) to get the latest
-        latest_file = sorted(hmrc_files)[-1]
+        latest = hmrc_files.get(os.path.splitext(latest.name)[0] + '.parquet', latest)
+        latest_file = latest.name
         filepath = os.path.join(data_dir, latest_file)
         
-        print(f" Found latest document file: {latest_file}")
+        logger.info(" Found latest document file: %s", latest_file)
         return filepath
     
-    def add_documents(self, documents: List[Document]) -> List[str]:
-        """Add documents to the vector store."""
-        if not documents:
-            print("No documents to add")
-            return []
+    @staticmethod
+    def count_stored_documents(persist_directory: str = ".chromadb",
+                               collection_name: str = "hmrc_employment_securities",
+                               backend: str = "chroma") -> int:
+        """
+        Count the documents in a persisted collection without loading the embedding model.
+        
+        Args:
+            persist_directory: Directory holding the vector store
+            collection_name: Name of the collection
+            backend: "chroma" or "faiss"
+            
+        Returns:
+            Number of stored documents (0 if the collection does not exist)
+        """
+        if not os.path.isdir(persist_directory):
+            return 0
+        
+        if backend == "faiss":
+            index_path = os.path.join(persist_directory, f"{collection_name}.faiss")
+            if faiss is None or not os.path.exists(index_path):
+                return 0
+            return faiss.read_index(index_path).ntotal
+        
+        client = chromadb.PersistentClient(path=persist_directory)
+        if collection_name not in {getattr(c, 'name', c) for c in client.list_collections()}:
+            return 0
+        return client.get_collection(collection_name).count()
+    
+    @property
+    def embedding_cache(self) -> Optional[EmbeddingCache]:
+        """Document embedding cache, or None when disabled; opened when first needed."""
+        if self._embedding_cache is None and self.embedding_cache_path:
+            self._embedding_cache = EmbeddingCache(self.embedding_cache_path)
+        return self._embedding_cache
+    
+    def _embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing cached vectors and encoding each distinct unseen text once."""
+        hashes = [EmbeddingCache.content_hash(text) for text in texts]
+        embedding_cache = self.embedding_cache
+        cached = embedding_cache.get_many(self.embedding_model, hashes) if embedding_cache is not None else {}
+        
+        # Repeated boilerplate chunks share one encoding; every document still gets its own entry
+        missing = {}
+        for content_hash, text in zip(hashes, texts):
+            if content_hash not in cached:
+                missing.setdefault(content_hash, text)
+        
+        if missing:
+            logger.debug("Embedding %s new chunks (%s cached)", len(missing), len(cached))
+            new_vectors = dict(zip(missing, self.embeddings.embed_documents(list(missing.values()))))
+            if embedding_cache is not None:
+                embedding_cache.put_many(self.embedding_model, new_vectors)
+            cached.update(new_vectors)
+        else:
+            logger.debug("All %s chunk embeddings served from cache", len(cached))
+        
+        return [cached[content_hash] for content_hash in hashes]
+    
+    def _add_batch(self, documents: List[Document]) -> List[str]:
+        """Embed one batch of documents and write it to the backend."""
+        texts = [doc.page_content for doc in documents]
+        embeddings = self._embed_documents(texts)
+        
+        # Add documents to vector store with precomputed embeddings
+        if self.backend == "faiss":
+            return self.faiss_index.add(documents, embeddings)
+        
+        doc_ids = [str(uuid.uuid4()) for _ in documents]
+        self.vector_store._collection.add(
+            ids=doc_ids,
+            embeddings=[np.asarray(vector, dtype=np.float32) for vector in embeddings],
+            documents=texts,
+            metadatas=[doc.metadata or None for doc in documents]
+        )
+        return doc_ids
+    
+    def add_documents(self, documents: Iterable[Document], batch_size: int = 256) -> List[str]:
+        """Add documents to the vector store, streaming them in batches to bound memory."""
+        if self.backend == "chroma":
+            batch_size = min(batch_size, self.vector_store._client.get_max_batch_size())
         
         try:
-            print(f"Adding {len(documents)} documents to vector store...")
+            logger.info("Adding documents to vector store...")
             
-            # Add documents to vector store
-            doc_ids = self.vector_store.add_documents(documents)
+            doc_ids = []
+            iterator = iter(documents)
+            while True:
+                batch = list(islice(iterator, batch_size))
+                if not batch:
+                    break
+                doc_ids.extend(self._add_batch(batch))
+                logger.info("   Added %s documents so far", len(doc_ids))
             
-            print(f" Successfully added {len(doc_ids)} documents")
+            if not doc_ids:
+                logger.warning("No documents to add")
+                return []
+            
+            if self.backend == "faiss":
+                self.faiss_index.save()
+            
+            logger.info(" Successfully added %s documents", len(doc_ids))
             return doc_ids
             
         except Exception as e:
-            print(f" Error adding documents: {str(e)}")
+            logger.error(" Error adding documents: %s", e)
             raise
     
     def similarity_search(self, 
@@ -133,16 +466,15 @@ class HMRCVectorStore:
         try:
             if score_threshold is not None:
                 # Use similarity search with score threshold
-                results = self.vector_store.similarity_search_with_score(query, k=k)
+                results = self.similarity_search_with_scores(query, k=k)
                 filtered_results = [doc for doc, score in results if score >= score_threshold]
                 return filtered_results
             else:
                 # Standard similarity search
-                results = self.vector_store.similarity_search(query, k=k)
-                return results
+                return [doc for doc, score in self.similarity_search_with_scores(query, k=k)]
                 
         except Exception as e:
-            print(f" Error during similarity search: {str(e)}")
+            logger.error(" Error during similarity search: %s", e)
             raise
     
     def similarity_search_with_scores(self, 
@@ -159,35 +491,105 @@ class HMRCVectorStore:
             List of (document, score) tuples
         """
         try:
-            results = self.vector_store.similarity_search_with_score(query, k=k)
-            return results
+            # Query the backend directly rather than through LangChain's Chroma wrapper
+            return self._search_by_vectors([self.embeddings.embed_query(query)], k)[0]
+            
+        except Exception as e:
+            logger.error(" Error during similarity search with scores: %s", e)
+            raise
+    
+    def _search_by_vectors(self, embeddings: List[List[float]], k: int) -> List[List[Tuple[Document, float]]]:
+        """Run one backend query for a batch of query embeddings."""
+        if self.backend == "faiss":
+            return self.faiss_index.search(embeddings, k)
+        
+        raw = self.vector_store._collection.query(
+            query_embeddings=[np.asarray(embedding, dtype=np.float32) for embedding in embeddings],
+            n_results=k,
+            include=['documents', 'metadatas', 'distances']
+        )
+        
+        return [
+            [
+                (Document(page_content=text, metadata=metadata or {}, id=doc_id), distance)
+                for text, metadata, doc_id, distance in zip(documents, metadatas, ids, distances)
+            ]
+            for documents, metadatas, ids, distances in zip(
+                raw['documents'], raw['metadatas'], raw['ids'], raw['distances']
+            )
+        ]
+    
+    def similarity_search_by_vector_with_scores(self,
+                                                embedding: List[float],
+                                                k: int = 5) -> List[Tuple[Document, float]]:
+        """
+        Search for similar documents using an already computed query embedding.
+        
+        Args:
+            embedding: Query embedding (as produced by self.embeddings.embed_query)
+            k: Number of results to return
+            
+        Returns:
+            List of (document, score) tuples
+        """
+        try:
+            return self._search_by_vectors([embedding], k)[0]
             
         except Exception as e:
-            print(f" Error during similarity search with scores: {str(e)}")
+            logger.error(" Error during similarity search by vector: %s", e)
+            raise
+    
+    def batch_similarity_search(self,
+                                queries: List[str],
+                                k: int = 5) -> List[List[Tuple[Document, float]]]:
+        """
+        Search for several queries at once, embedding them in a single batch.
+        
+        Args:
+            queries: Search queries
+            k: Number of results to return per query
+            
+        Returns:
+            One list of (document, score) tuples per query, in query order
+        """
+        if not queries:
+            return []
+        
+        try:
+            return self._search_by_vectors(self.embeddings.embed_documents(queries), k)
+            
+        except Exception as e:
+            logger.error(" Error during batch similarity search: %s", e)
             raise
     
     def get_document_count(self) -> int:
         """Get the total number of documents in the vector store."""
         try:
+            if self.backend == "faiss":
+                return self.faiss_index.count()
+            
             # Get the underlying collection
             collection = self.vector_store._collection
             return collection.count()
             
         except Exception as e:
-            print(f" Error getting document count: {str(e)}")
+            logger.error(" Error getting document count: %s", e)
             return 0
     
     def delete_collection(self):
         """Delete the entire collection (use with caution)."""
         try:
-            self.vector_store.delete_collection()
-            print(f" Deleted collection: {self.collection_name}")
+            if self.backend == "faiss":
+                self.faiss_index.reset()
+            else:
+                self.vector_store.delete_collection()
+            logger.info(" Deleted collection: %s", self.collection_name)
             
             # Reinitialize empty vector store
             self._initialize_vector_store()
             
         except Exception as e:
-            print(f" Error deleting collection: {str(e)}")
+            logger.error(" Error deleting collection: %s", e)
             raise
     
     def get_collection_info(self) -> Dict[str, Any]:
@@ -197,16 +599,22 @@ class HMRCVectorStore:
             
             info = {
                 'collection_name': self.collection_name,
+                'backend': self.backend,
                 'persist_directory': self.persist_directory,
                 'document_count': count,
                 'embedding_model': self.embeddings.model_name,
+                'embedding_device': self.device,
                 'created_at': datetime.now().isoformat()
             }
             
+            # The parameters the collection was actually built with, which may predate this instance
+            if self.backend == "chroma":
+                info['collection_metadata'] = self.vector_store._collection.metadata
+            
             return info
             
         except Exception as e:
-            print(f" Error getting collection info: {str(e)}")
+            logger.error(" Error getting collection info: %s", e)
             return {}
     
     def save_collection_info(self, filepath: str = None):
@@ -218,41 +626,51 @@ class HMRCVectorStore:
         try:
             info = self.get_collection_info()
             
-            with open(filepath, 'w') as f:
-                json.dump(info, f, indent=2)
+            if orjson is not None:
+                with open(filepath, 'wb') as f:
+                    f.write(orjson.dumps(info, option=orjson.OPT_INDENT_2))
+            else:
+                with open(filepath, 'w') as f:
+                    json.dump(info, f, indent=2)
             
-            print(f" Collection info saved to: {filepath}")
+            logger.info(" Collection info saved to: %s", filepath)
             return filepath
             
         except Exception as e:
-            print(f" Error saving collection info: {str(e)}")
+            logger.error(" Error saving collection info: %s", e)
             raise
     
-    def setup_from_documents(self, data_dir: str = "data") -> int:
+    def setup_from_documents(self, data_dir: str = "data", mode: str = "append") -> int:
         """
         Complete setup: load latest documents and add to vector store.
         
         Args:
             data_dir: Directory containing processed documents
+            mode: What to do if the store already has documents:
+                  "append" (add alongside), "recreate" (delete first) or "error" (raise)
             
         Returns:
             Number of documents added
         """
         try:
-            print("=== Setting up vector store from documents ===\n")
+            if mode not in ("append", "recreate", "error"):
+                raise ValueError(f"Unknown setup mode: {mode}")
+            
+            logger.info("=== Setting up vector store from documents ===\n")
             
             # Find and load latest document file
             filepath = self.find_latest_document_file(data_dir)
-            documents = self.load_documents_from_file(filepath)
+            documents = self.iter_documents_from_file(filepath)
             
             # Check if documents already exist
             current_count = self.get_document_count()
             if current_count > 0:
-                print(f"Vector store already contains {current_count} documents")
-                user_input = input("Do you want to add more documents (a) or recreate (r)? [a/r]: ").lower()
+                logger.info("Vector store already contains %s documents", current_count)
                 
-                if user_input == 'r':
-                    print("Recreating vector store...")
+                if mode == "error":
+                    raise RuntimeError(f"Vector store already contains {current_count} documents")
+                if mode == "recreate":
+                    logger.info("Recreating vector store...")
                     self.delete_collection()
             
             # Add documents to vector store
@@ -261,24 +679,25 @@ class HMRCVectorStore:
             # Save collection info
             self.save_collection_info()
             
-            print(f"\n=== Vector store setup complete ===")
-            print(f"Added {len(doc_ids)} documents")
-            print(f"Total documents in store: {self.get_document_count()}")
+            logger.info("\n=== Vector store setup complete ===")
+            logger.info("Added %s documents", len(doc_ids))
+            logger.info("Total documents in store: %s", self.get_document_count())
             
             return len(doc_ids)
             
         except Exception as e:
-            print(f" Setup failed: {str(e)}")
+            logger.error(" Setup failed: %s", e)
             raise
 
 
 def main():
     """Example usage of the HMRC vector store."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     vector_store = HMRCVectorStore()
     
     try:
         # Setup vector store from documents
-        added_count = vector_store.setup_from_documents()
+        added_count = vector_store.setup_from_documents(mode=os.environ.get("HMRC_SETUP_MODE", "append"))
         
         if added_count > 0:
             print(f"\n=== Testing similarity search ===")
@@ -9,32 +9,89 @@ that can be called from Node.js backend.
 
 Usage:
     python3 rag_bridge.py "What are EMI schemes?"
+    python3 rag_bridge.py "search_batch: EMI schemes | CSOP | SAYE"
+    python3 rag_bridge.py --stream "What are EMI schemes?"   # NDJSON: {"delta": ...} lines, then the full response
+    python3 rag_bridge.py --serve    # keep models loaded in a long-lived worker
     
-Returns JSON response with answer and sources.
+Returns JSON response with answer and sources. When a --serve worker is
+running, CLI calls are forwarded to it over a Unix socket instead of
+loading the RAG stack in-process.
 """
 
 import sys
 import json
 import os
+import signal
+import socket
+import socketserver
+import logging
+import importlib.util
+import tempfile
 import warnings
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+# Optional: faster JSON encoding of responses
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Suppress all warnings that interfere with backend command execution
 warnings.filterwarnings("ignore")
 
+# stdout carries the JSON response; RAG progress logging stays off it and below ERROR is dropped
+logging.basicConfig(level=logging.ERROR, stream=sys.stderr)
+
 # Add the rag directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), 'rag'))
 
-try:
-    from rag.retriever_backup import HMRCRetriever
-except ImportError as e:
-    print(json.dumps({
-        "error": f"Failed to import RAG modules: {str(e)}",
-        "answer": "I'm having trouble accessing the HMRC knowledge base right now.",
-        "sources": [],
-        "rag_available": False
-    }))
-    sys.exit(1)
+# Socket shared by the --serve worker and the CLI client
+SOCKET_PATH = os.environ.get("HMRC_RAG_SOCKET", os.path.join(tempfile.gettempdir(), "hmrc_rag_bridge.sock"))
+
+# Separator between queries in a "search_batch:" command
+BATCH_QUERY_SEPARATOR = "|"
+
+# Stream the JSON responses are written to. main() points sys.stdout at stderr, so
+# anything else printed by the RAG stack or its dependencies can't corrupt them.
+_response_stream = sys.stdout
+
+
+def _reserve_stdout_for_responses():
+    """Keep the real stdout for _emit and send every other print to stderr."""
+    global _response_stream
+    _response_stream = sys.stdout
+    sys.stdout = sys.stderr
+
+
+def _dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, using orjson when available."""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+
+def _emit(obj: Any, indent: bool = True):
+    """Write a JSON response to stdout."""
+    _response_stream.flush()
+    _response_stream.buffer.write(_dumps(obj, indent) + b"\n")
+    _response_stream.buffer.flush()
+
+
+def _check_rag_imports():
+    """Exit with a JSON error if the RAG modules are missing.
+    
+    Only their presence is checked; RAGBridge reports a failing import as unavailable.
+    """
+    if importlib.util.find_spec('rag.retriever') is None:
+        _emit({
+            "error": "Failed to import RAG modules: No module named 'rag.retriever'",
+            "answer": "I'm having trouble accessing the HMRC knowledge base right now.",
+            "sources": [],
+            "rag_available": False
+        }, indent=False)
+        sys.exit(1)
 
 
 class RAGBridge:
@@ -46,33 +103,17 @@ class RAGBridge:
         self.rag_available = False
         
         try:
-            # Suppress output during initialization for JSON API
-            import sys
-            from io import StringIO
-            old_stdout = sys.stdout
-            old_stderr = sys.stderr
-            sys.stdout = StringIO()
-            sys.stderr = StringIO()
+            from rag.retriever import HMRCRetriever
             
-            try:
-                # Use backup retriever for speed and reliability
-                import sys, os
-                sys.path.append(os.path.join(os.path.dirname(__file__), 'rag'))
-                from rag.retriever_backup import HMRCRetriever
-                
-                # Fast initialization - defer LLM connection until needed
-                self.retriever = HMRCRetriever(
-                    vector_store_dir=".chromadb",
-                    collection_name="hmrc_employment_securities",
-                    k=5   # Optimized for sub-30s response times while maintaining quality
-                )
-                
-                # Skip connection test for faster startup - just check if retriever initialized
-                self.rag_available = self.retriever is not None
-            finally:
-                # Restore output
-                sys.stdout = old_stdout
-                sys.stderr = old_stderr
+            # Fast initialization - defer LLM connection until needed
+            self.retriever = HMRCRetriever(
+                vector_store_dir=".chromadb",
+                collection_name="hmrc_employment_securities",
+                k=5   # Optimized for sub-30s response times while maintaining quality
+            )
+            
+            # Skip connection test for faster startup - just check if retriever initialized
+            self.rag_available = self.retriever is not None
             
         except Exception as e:
             self.rag_available = False
@@ -98,30 +139,17 @@ class RAGBridge:
             }
         
         try:
-            # Suppress output during question processing for clean JSON
-            import sys
-            from io import StringIO
-            old_stdout = sys.stdout
-            old_stderr = sys.stderr
-            sys.stdout = StringIO()
-            sys.stderr = StringIO()
+            # Get RAG response
+            response = self.retriever.ask_question(question)
             
-            try:
-                # Get RAG response
-                response = self.retriever.ask_question(question)
-                
-                # Format for Node.js consumption
-                return {
-                    "answer": response["answer"],
-                    "sources": response["sources"],
-                    "metadata": response["metadata"],
-                    "rag_available": True,
-                    "fallback_mode": False
-                }
-            finally:
-                # Restore output
-                sys.stdout = old_stdout
-                sys.stderr = old_stderr
+            # Format for Node.js consumption
+            return {
+                "answer": response["answer"],
+                "sources": response["sources"],
+                "metadata": response["metadata"],
+                "rag_available": True,
+                "fallback_mode": False
+            }
             
         except Exception as e:
             return {
@@ -132,6 +160,36 @@ class RAGBridge:
                 "fallback_mode": True
             }
     
+    def ask_question_stream(self, question: str) -> Iterator[Dict[str, Any]]:
+        """
+        Ask a question and stream the answer as it is generated.
+        
+        Args:
+            question: User's question
+            
+        Yields:
+            {"delta": text} events, then the full response with "done": True
+        """
+        if not self.rag_available or not self.retriever:
+            yield {**self.ask_question(question), "done": True}
+            return
+        
+        try:
+            for event in self.retriever.ask_question_stream(question):
+                if event.get("done"):
+                    event = {**event, "rag_available": True, "fallback_mode": False}
+                yield event
+                
+        except Exception as e:
+            yield {
+                "error": str(e),
+                "answer": "I encountered an error while searching the HMRC knowledge base. Let me try to help with general information.",
+                "sources": [],
+                "rag_available": False,
+                "fallback_mode": True,
+                "done": True
+            }
+    
     def search_documents(self, query: str, k: int = 3) -> Dict[str, Any]:
         """
         Search for relevant documents without generating an answer.
@@ -166,60 +224,252 @@ class RAGBridge:
                 "results": [],
                 "rag_available": False
             }
-
-
-def main():
-    """Main CLI interface."""
-    # Support both command line and stdin input for robust shell execution
-    if len(sys.argv) >= 2:
-        question = sys.argv[1]
-    else:
-        # Read from stdin to avoid shell escaping issues
+    
+    def search_documents_batch(self, queries: List[str], k: int = 3) -> Dict[str, Any]:
+        """
+        Search for relevant documents for several queries in one batch.
+        
+        Args:
+            queries: Search queries
+            k: Number of documents to return per query
+            
+        Returns:
+            Dictionary with one result list per query
+        """
+        if not self.rag_available or not self.retriever:
+            return {
+                "error": "RAG system not available",
+                "results": [],
+                "rag_available": False
+            }
+        
         try:
-            question = sys.stdin.read().strip()
-            if not question:
-                raise ValueError("Empty input")
-        except Exception:
-            print(json.dumps({
-                "error": "No question provided via argv or stdin",
-                "usage": "echo 'Your question here' | python3 rag_bridge.py OR python3 rag_bridge.py 'Your question here'",
+            results = self.retriever.search_similar_documents_batch(queries, k)
+            
+            return {
+                "results": results,
+                "queries": queries,
+                "count": sum(len(query_results) for query_results in results),
+                "rag_available": True
+            }
+            
+        except Exception as e:
+            return {
+                "error": str(e),
+                "results": [],
                 "rag_available": False
-            }))
-            sys.exit(1)
-    
-    # Initialize bridge
-    bridge = RAGBridge()
+            }
+
+
+@lru_cache(maxsize=1)
+def get_bridge() -> RAGBridge:
+    """Return the process-wide RAG bridge, initializing it on first use."""
+    return RAGBridge()
+
+
+def handle_query(question: str) -> Tuple[Dict[str, Any], int]:
+    """Answer one bridge query; returns (JSON response, exit code)."""
+    bridge = get_bridge()
     
     # Check for special commands
     if question.lower() == "status":
-        status = {
+        return {
             "rag_available": bridge.rag_available,
             "retriever_initialized": bridge.retriever is not None,
             "error": getattr(bridge, 'error_message', None) if not bridge.rag_available else None
-        }
-        print(json.dumps(status, indent=2))
-        return
+        }, 0
     
     elif question.lower().startswith("search:"):
         search_query = question[7:].strip()
-        result = bridge.search_documents(search_query)
-        print(json.dumps(result, indent=2))
-        return
+        return bridge.search_documents(search_query), 0
+    
+    elif question.lower().startswith("search_batch:"):
+        queries = [q.strip() for q in question[13:].split(BATCH_QUERY_SEPARATOR) if q.strip()]
+        return bridge.search_documents_batch(queries), 0
     
     # Normal question processing
     try:
-        result = bridge.ask_question(question)
-        print(json.dumps(result, indent=2))
+        return bridge.ask_question(question), 0
         
     except Exception as e:
-        error_response = {
+        return {
             "error": str(e),
             "answer": "I encountered an unexpected error while processing your question.",
             "sources": [],
             "rag_available": False
-        }
-        print(json.dumps(error_response, indent=2))
-        sys.exit(1)
+        }, 1
+
+
+def handle_stream_query(question: str) -> Iterator[Dict[str, Any]]:
+    """Answer one bridge query as a stream of events; commands yield a single response."""
+    lowered = question.lower()
+    if lowered == "status" or lowered.startswith(("search:", "search_batch:")):
+        yield handle_query(question)[0]
+        return
+    
+    yield from get_bridge().ask_question_stream(question)
+
+
+class _BridgeRequestHandler(socketserver.StreamRequestHandler):
+    """Answer newline-delimited JSON queries from CLI clients."""
+    
+    def _send(self, message: Dict[str, Any]):
+        self.wfile.write(_dumps(message) + b"\n")
+        self.wfile.flush()
+    
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                question = request["query"]
+            except (ValueError, KeyError, TypeError):
+                self._send({"result": {"error": "Malformed request", "rag_available": False}, "exit_code": 1})
+                continue
+            
+            if request.get("stream"):
+                # One {"event": ...} line per event, then a closing exit code
+                for event in handle_stream_query(question):
+                    self._send({"event": event})
+                self._send({"exit_code": 0})
+            else:
+                result, exit_code = handle_query(question)
+                self._send({"result": result, "exit_code": exit_code})
+
+
+def _connect_server(socket_path: str) -> Optional[socket.socket]:
+    """Connect to a running --serve worker; returns None if there is none."""
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+        return None
+    
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        # Stale socket file
+        sock.close()
+        return None
+    return sock
+
+
+def _query_server(question: str, socket_path: str = SOCKET_PATH) -> Optional[Tuple[Dict[str, Any], int]]:
+    """Forward a query to a running --serve worker; returns None if there is none."""
+    sock = _connect_server(socket_path)
+    if sock is None:
+        return None
+    
+    try:
+        with sock:
+            sock.sendall(_dumps({"query": question}) + b"\n")
+            with sock.makefile('rb') as reply_file:
+                reply = json.loads(reply_file.readline())
+        return reply["result"], reply.get("exit_code", 0)
+    except (OSError, ValueError, KeyError):
+        # Worker went away - answer in-process instead
+        return None
+
+
+def _stream_from_server(question: str, socket_path: str = SOCKET_PATH) -> Optional[int]:
+    """Stream a query's events from a running --serve worker to stdout; returns None if there is none."""
+    sock = _connect_server(socket_path)
+    if sock is None:
+        return None
+    
+    emitted = False
+    try:
+        with sock:
+            sock.sendall(_dumps({"query": question, "stream": True}) + b"\n")
+            with sock.makefile('rb') as reply_file:
+                for line in reply_file:
+                    message = json.loads(line)
+                    if "event" not in message:
+                        return message.get("exit_code", 0)
+                    _emit(message["event"], indent=False)
+                    emitted = True
+    except (OSError, ValueError):
+        pass
+    
+    # Worker went away: answer in-process unless part of the stream was already sent
+    return 1 if emitted else None
+
+
+def serve(socket_path: str = SOCKET_PATH):
+    """Run a long-lived worker that keeps the retriever loaded between queries."""
+    if _query_server("status", socket_path) is not None:
+        print(f"RAG bridge already serving on {socket_path}", file=sys.stderr)
+        return
+    
+    _check_rag_imports()
+    bridge = get_bridge()
+    print(f"RAG bridge initialized (rag_available={bridge.rag_available})", file=sys.stderr)
+    
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    
+    # Treat SIGTERM like Ctrl-C so the socket file is removed on shutdown
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
+    with socketserver.ThreadingUnixStreamServer(socket_path, _BridgeRequestHandler) as server:
+        server.daemon_threads = True
+        print(f"Serving RAG bridge on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+def main():
+    """Main CLI interface."""
+    _reserve_stdout_for_responses()
+    args = sys.argv[1:]
+    if args[:1] == ["--serve"]:
+        serve()
+        return
+    
+    stream = "--stream" in args
+    if stream:
+        args.remove("--stream")
+    
+    # Support both command line and stdin input for robust shell execution
+    if args:
+        question = args[0]
+    else:
+        # Read from stdin to avoid shell escaping issues
+        try:
+            question = sys.stdin.read().strip()
+            if not question:
+                raise ValueError("Empty input")
+        except Exception:
+            _emit({
+                "error": "No question provided via argv or stdin",
+                "usage": "echo 'Your question here' | python3 rag_bridge.py OR python3 rag_bridge.py 'Your question here'",
+                "rag_available": False
+            }, indent=False)
+            sys.exit(1)
+    
+    if stream:
+        # NDJSON: one line per event, flushed as soon as it is generated
+        exit_code = _stream_from_server(question)
+        if exit_code is None:
+            _check_rag_imports()
+            exit_code = 0
+            for event in handle_stream_query(question):
+                _emit(event, indent=False)
+        if exit_code:
+            sys.exit(exit_code)
+        return
+    
+    # Prefer an already-warm worker; fall back to initializing in-process
+    reply = _query_server(question)
+    if reply is None:
+        _check_rag_imports()
+        reply = handle_query(question)
+    
+    result, exit_code = reply
+    _emit(result)
+    if exit_code:
+        sys.exit(exit_code)
 
 
 if __name__ == "__main__":
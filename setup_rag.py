@@ -23,23 +23,36 @@ Requirements:
 
 import os
 import sys
+import logging
 import argparse
 import time
+import queue
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain, islice
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, Optional
 
 # Add the rag directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), 'rag'))
 
-try:
+if TYPE_CHECKING:
     from rag.document_loader import HMRCDocumentLoader
     from rag.vector_store import HMRCVectorStore
-    from rag.retriever import HMRCRetriever
-except ImportError as e:
-    print(f"L Import error: {e}")
+
+# The RAG modules are imported where they are used, so --verify-only doesn't pay for
+# LangChain, the embedding stack or the HTTP client; only their presence is checked here
+_RAG_MODULES = ('rag.document_loader', 'rag.vector_store', 'rag.retriever')
+_missing_modules = [name for name in _RAG_MODULES if importlib.util.find_spec(name) is None]
+if _missing_modules:
+    print(f"L Import error: No module named {', '.join(_missing_modules)}")
     print("Please ensure all RAG modules are in the rag/ directory")
     sys.exit(1)
 
+# Line breaks and tabs flattened to spaces in one-line answer previews
+_PREVIEW_TRANS = str.maketrans({"\n": " ", "\r": " ", "\t": " "})
+
 
 class RAGSetupManager:
     """Manages the complete RAG system setup pipeline."""
@@ -49,7 +62,15 @@ class RAGSetupManager:
                  vector_store_dir: str = ".chromadb",
                  collection_name: str = "hmrc_employment_securities",
                  force_reload: bool = False,
-                 test_queries: bool = True):
+                 test_queries: bool = True,
+                 fetch_concurrency: Optional[int] = None,
+                 split_workers: Optional[int] = None,
+                 batch_size: int = 256,
+                 use_answer_cache: bool = True,
+                 hnsw_m: int = 16,
+                 hnsw_search_ef: int = 100,
+                 backend: str = "chroma",
+                 quantize: bool = False):
         """
         Initialize RAG setup manager.
         
@@ -59,17 +80,42 @@ class RAGSetupManager:
             collection_name: Name of the vector collection
             force_reload: Force reload of documents even if they exist
             test_queries: Run test queries after setup
+            fetch_concurrency: Simultaneous page fetches (loader default if None)
+            split_workers: Processes used to split documents into chunks (one per core if None)
+            batch_size: Documents embedded and inserted per vector store call
+            use_answer_cache: Reuse test-query answers from earlier runs
+            hnsw_m: HNSW graph links per node, applied when the collection is (re)created
+            hnsw_search_ef: HNSW query candidate list size, applied when the collection is (re)created
+            backend: Vector store backend, "chroma" or "faiss"
+            quantize: Store int8 scalar-quantized vectors (FAISS backend only)
         """
         self.data_dir = data_dir
         self.vector_store_dir = vector_store_dir
         self.collection_name = collection_name
         self.force_reload = force_reload
         self.test_queries = test_queries
+        self.fetch_concurrency = fetch_concurrency
+        self.split_workers = split_workers
+        self.batch_size = batch_size
+        self.use_answer_cache = use_answer_cache
+        self.hnsw_m = hnsw_m
+        self.hnsw_search_ef = hnsw_search_ef
+        self.backend = backend
+        self.quantize = quantize
         
+        # Wall clock for display; elapsed times use the monotonic counter
         self.setup_start_time = datetime.now()
+        self._start_ns = time.perf_counter_ns()
         self.steps_completed = []
         self.setup_info = {}
         
+        # Opened in step 2 and shared with the retriever in step 3 (one embedding model load)
+        self.vector_store: Optional["HMRCVectorStore"] = None
+        
+        # Latest saved document file: the data directory is scanned once, then step 1 keeps it current
+        self._documents_file: Optional[str] = None
+        self._documents_file_scanned = False
+        
         # Create directories
         os.makedirs(data_dir, exist_ok=True)
         os.makedirs(vector_store_dir, exist_ok=True)
@@ -87,45 +133,91 @@ class RAGSetupManager:
         print(f">� Test Queries: {self.test_queries}")
         print("=" * 80)
     
+    def _existing_documents_file(self) -> Optional[str]:
+        """Latest saved document file (Parquet or legacy pickle), or None."""
+        if not self._documents_file_scanned:
+            self._documents_file_scanned = True
+            from rag.vector_store import HMRCVectorStore
+            try:
+                self._documents_file = HMRCVectorStore.find_latest_document_file(self.data_dir)
+            except FileNotFoundError:
+                pass
+        return self._documents_file
+    
+    def _saved_documents_file(self, filename: str) -> Optional[str]:
+        """Path of the document file just saved under filename, which becomes the latest."""
+        from rag.vector_store import DOCUMENT_FILE_EXTENSIONS
+        for extension in DOCUMENT_FILE_EXTENSIONS:
+            path = os.path.join(self.data_dir, filename + extension)
+            if os.path.exists(path):
+                self._documents_file = path
+                self._documents_file_scanned = True
+                return path
+        return None
+    
+    def _make_loader(self) -> "HMRCDocumentLoader":
+        """Document loader configured from the setup options."""
+        from rag.document_loader import HMRCDocumentLoader
+        loader_options = {}
+        if self.force_reload:
+            # Revalidate every cached page: unchanged pages cost a conditional GET answered
+            # with 304 and reuse their cached HTML and parse; only changed pages are re-fetched
+            loader_options['cache_max_age'] = 0
+        if self.fetch_concurrency:
+            loader_options['max_concurrency'] = self.fetch_concurrency
+        if self.split_workers:
+            loader_options['split_workers'] = self.split_workers
+        return HMRCDocumentLoader(data_dir=self.data_dir, **loader_options)
+    
+    def _open_vector_store(self) -> "HMRCVectorStore":
+        """Open the vector store once; later steps share it."""
+        if self.vector_store is None:
+            from rag.vector_store import HMRCVectorStore
+            self.vector_store = HMRCVectorStore(
+                persist_directory=self.vector_store_dir,
+                collection_name=self.collection_name,
+                backend=self.backend,
+                quantize=self.quantize,
+                hnsw_m=self.hnsw_m,
+                hnsw_search_ef=self.hnsw_search_ef
+            )
+        return self.vector_store
+    
     def step_1_load_documents(self) -> bool:
         """Step 1: Load and process HMRC documents."""
         print("\n=� STEP 1: Loading HMRC Documents")
         print("-" * 50)
         
         try:
-            # Check if documents already exist
-            existing_files = []
-            if os.path.exists(self.data_dir):
-                existing_files = [f for f in os.listdir(self.data_dir) 
-                                if f.startswith('hmrc_docs_') and f.endswith('.pkl')]
-            
-            if existing_files and not self.force_reload:
-                latest_file = sorted(existing_files)[-1]
-                print(f" Found existing documents: {latest_file}")
+            # Check if documents already exist (Parquet or legacy pickle)
+            existing_file = self._existing_documents_file()
+            
+            if existing_file and not self.force_reload:
+                print(f" Found existing documents: {os.path.basename(existing_file)}")
                 print("   Use --force-reload to reload from web sources")
                 
-                self.setup_info['documents_file'] = os.path.join(self.data_dir, latest_file)
+                self.setup_info['documents_file'] = existing_file
                 self.setup_info['documents_reloaded'] = False
                 self.steps_completed.append("load_documents")
                 return True
             
             # Load documents from web
             print("< Loading documents from HMRC website...")
-            loader = HMRCDocumentLoader(data_dir=self.data_dir)
+            loader = self._make_loader()
             
             # Process all documents
-            chunks = loader.process_all()
+            filename = f"hmrc_docs_enhanced_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            chunks = loader.process_all(save_filename=filename)
             
             if not chunks:
                 print("L No documents were loaded successfully")
                 return False
             
-            # Find the saved file
-            saved_files = [f for f in os.listdir(self.data_dir) 
-                          if f.startswith('hmrc_docs_') and f.endswith('.pkl')]
-            latest_file = sorted(saved_files)[-1]
+            # The saved file is known by name, so the data directory is not rescanned
+            documents_file = self._saved_documents_file(filename)
+            latest_file = os.path.basename(documents_file)
             
-            self.setup_info['documents_file'] = os.path.join(self.data_dir, latest_file)
+            self.setup_info['documents_file'] = documents_file
             self.setup_info['documents_count'] = len(chunks)
             self.setup_info['documents_reloaded'] = True
             
@@ -147,10 +239,7 @@ class RAGSetupManager:
         try:
             # Initialize vector store
             print("=' Initializing vector store...")
-            vector_store = HMRCVectorStore(
-                persist_directory=self.vector_store_dir,
-                collection_name=self.collection_name
-            )
+            vector_store = self._open_vector_store()
             
             # Check if vector store already has documents
             existing_count = vector_store.get_document_count()
@@ -175,12 +264,13 @@ class RAGSetupManager:
                 # Try to find latest file
                 documents_file = vector_store.find_latest_document_file(self.data_dir)
             
-            documents = vector_store.load_documents_from_file(documents_file)
+            # Streamed from disk in batches rather than loaded all at once
+            documents = vector_store.iter_documents_from_file(documents_file)
             
             print("= Creating embeddings and storing in vector database...")
             print("   This may take a few minutes...")
             
-            doc_ids = vector_store.add_documents(documents)
+            doc_ids = vector_store.add_documents(documents, batch_size=self.batch_size)
             
             # Save collection info
             info_file = vector_store.save_collection_info()
@@ -199,6 +289,109 @@ class RAGSetupManager:
             print(f"L Vector store creation failed: {str(e)}")
             return False
     
+    def steps_1_2_pipelined(self) -> bool:
+        """Steps 1 and 2 overlapped: chunks are embedded while later pages are still being fetched."""
+        from rag.vector_store import DOCUMENT_FILE_EXTENSIONS
+        try:
+            vector_store = self._open_vector_store()
+            existing_count = vector_store.get_document_count()
+        except Exception as e:
+            print(f"Vector store initialization failed: {str(e)}")
+            return False
+        
+        # The store is already built and only the document file is missing: keep the store
+        if existing_count > 0 and not self.force_reload:
+            return self.step_1_load_documents() and self.step_2_create_vector_store()
+        
+        print("\nSTEPS 1-2: Loading HMRC Documents into the Vector Store")
+        print("-" * 50)
+        
+        try:
+            print("Loading documents from HMRC website, embedding chunks as they arrive...")
+            print("   This may take a few minutes...")
+            loader = self._make_loader()
+            chunks = loader.iter_chunks(loader.iter_documents())
+            
+            # A background thread fetches, splits and saves chunks; this thread embeds them.
+            # The bounded queue lets fetching run ahead by a few batches but no further.
+            handoff = queue.Queue(maxsize=4 * self.batch_size)
+            end = object()
+            stopped = threading.Event()
+            saved = {}
+            filename = f"hmrc_docs_enhanced_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            
+            def tee():
+                for chunk in chunks:
+                    if stopped.is_set():
+                        raise RuntimeError("vector store insertion stopped")
+                    handoff.put(chunk)
+                    yield chunk
+            
+            def produce():
+                try:
+                    loader.save_documents(tee(), filename)
+                except Exception as e:
+                    saved['error'] = e
+                finally:
+                    handoff.put(end)
+            
+            producer = threading.Thread(target=produce, name="hmrc-document-loader", daemon=True)
+            producer.start()
+            doc_ids = []
+            try:
+                # The existing collection is only replaced once a first batch of new chunks has
+                # arrived, so a run that fetches nothing leaves it intact
+                incoming = iter(handoff.get, end)
+                first_batch = list(islice(incoming, self.batch_size))
+                if first_batch:
+                    if existing_count > 0:
+                        print("Deleting existing collection...")
+                        vector_store.delete_collection()
+                    doc_ids = vector_store.add_documents(chain(first_batch, incoming), batch_size=self.batch_size)
+            finally:
+                # If embedding failed, unblock the producer so it stops at its next chunk
+                stopped.set()
+                while True:
+                    try:
+                        handoff.get_nowait()
+                    except queue.Empty:
+                        break
+                producer.join()
+                
+                # A partial or empty document file must not be picked up as the latest by the next run
+                if 'error' in saved or not doc_ids:
+                    for extension in DOCUMENT_FILE_EXTENSIONS:
+                        partial_file = os.path.join(self.data_dir, filename + extension)
+                        if os.path.exists(partial_file):
+                            os.remove(partial_file)
+            
+            if 'error' in saved:
+                raise saved['error']
+            if not doc_ids:
+                print("No documents were loaded successfully")
+                return False
+            
+            info_file = vector_store.save_collection_info()
+            documents_file = self._saved_documents_file(filename)
+            
+            self.setup_info['documents_file'] = documents_file
+            self.setup_info['documents_count'] = loader.chunks_created
+            self.setup_info['documents_reloaded'] = True
+            self.setup_info['vector_store_created'] = True
+            self.setup_info['vector_store_count'] = len(doc_ids)
+            self.setup_info['vector_store_info_file'] = info_file
+            
+            print(f"Successfully processed and stored {len(doc_ids)} document chunks")
+            print(f"   Documents saved to: {os.path.basename(documents_file)}")
+            print(f"   Collection info saved to: {os.path.basename(info_file)}")
+            
+            self.steps_completed.extend(["load_documents", "create_vector_store"])
+            return True
+            
+        except Exception as e:
+            print(f"Document loading and embedding failed: {str(e)}")
+            return False
+    
     def step_3_test_retriever(self) -> bool:
         """Step 3: Initialize and test the RAG retriever."""
         print("\n>� STEP 3: Testing RAG Retriever")
@@ -207,11 +400,23 @@ class RAGSetupManager:
         try:
             # Initialize retriever
             print("=' Initializing RAG retriever...")
+            # Test-query answers persist per collection, so repeated setups skip the LLM
+            from rag.retriever import HMRCRetriever
+            cache_path = None
+            if self.use_answer_cache:
+                cache_path = os.path.join('.embcache', f'answers_{self.collection_name}.sqlite')
             retriever = HMRCRetriever(
                 vector_store_dir=self.vector_store_dir,
-                collection_name=self.collection_name
+                collection_name=self.collection_name,
+                vector_store=self.vector_store,
+                cache_ttl=float(os.environ.get('HMRC_SEM_CACHE_TTL', 3600)),
+                cache_path=cache_path
             )
             
+            # Answers cached against the previous collection are stale once it is rebuilt
+            if self.setup_info.get('vector_store_created'):
+                retriever.answer_cache.clear()
+            
             # Test connections
             print("= Testing connections...")
             connections = retriever.test_connection()
@@ -238,16 +443,31 @@ class RAGSetupManager:
                     "How do employment-related securities work?"
                 ]
                 
-                for i, question in enumerate(test_questions, 1):
-                    print(f"\n   Test {i}: {question}")
-                    
-                    start_time = time.time()
-                    response = retriever.ask_question(question)
-                    end_time = time.time()
-                    
-                    answer_preview = response['answer'][:150].replace('\n', ' ')
-                    print(f"    Response ({end_time-start_time:.1f}s): {answer_preview}...")
-                    print(f"   =� Sources: {len(response['sources'])}")
+                def timed_ask(question: str):
+                    # Streamed, so time to first token is measured alongside the full response
+                    start_ns = time.perf_counter_ns()
+                    first_token = None
+                    for event in retriever.ask_question_stream(question):
+                        if first_token is None:
+                            first_token = (time.perf_counter_ns() - start_ns) / 1e9
+                        if event.get("done"):
+                            response = event
+                    return response, first_token, (time.perf_counter_ns() - start_ns) / 1e9
+                
+                # The questions are independent, so their Ollama generations overlap
+                with ThreadPoolExecutor(max_workers=len(test_questions)) as executor:
+                    futures = {
+                        executor.submit(timed_ask, question): (i, question)
+                        for i, question in enumerate(test_questions, 1)
+                    }
+                    for future in as_completed(futures):
+                        i, question = futures[future]
+                        response, first_token, elapsed = future.result()
+                        print(f"\n   Test {i}: {question}")
+                        
+                        answer_preview = response['answer'][:150].translate(_PREVIEW_TRANS)
+                        print(f"    Response ({elapsed:.1f}s, first token {first_token:.2f}s{', cached' if response['metadata'].get('cache_hit') else ''}): {answer_preview}...")
+                        print(f"   =� Sources: {len(response['sources'])}")
             
             self.setup_info['retriever_initialized'] = True
             self.steps_completed.append("test_retriever")
@@ -259,10 +479,42 @@ class RAGSetupManager:
             print(f"L Retriever testing failed: {str(e)}")
             return False
     
+    def verify(self) -> bool:
+        """Quick health check of an existing setup: no model loads and no LLM generations."""
+        print("\nVERIFY: Checking the existing RAG setup")
+        print("-" * 50)
+        
+        from rag.vector_store import HMRCVectorStore
+        from rag.retriever import HMRCRetriever
+        
+        documents_file = self._existing_documents_file()
+        try:
+            document_count = HMRCVectorStore.count_stored_documents(
+                self.vector_store_dir, self.collection_name, self.backend
+            )
+        except Exception as e:
+            print(f"   Vector store check failed: {str(e)}")
+            document_count = 0
+        ollama = HMRCRetriever.check_ollama()
+        
+        checks = [
+            ("Documents file", documents_file is not None,
+             os.path.basename(documents_file) if documents_file else "none found"),
+            ("Vector store", document_count > 0, f"{document_count} documents"),
+            ("Ollama server", ollama["ollama_reachable"], "reachable" if ollama["ollama_reachable"] else "unreachable"),
+            ("Ollama model", ollama["model_available"], "pulled" if ollama["model_available"] else "not pulled")
+        ]
+        for name, ok, detail in checks:
+            print(f"   {'OK  ' if ok else 'FAIL'} {name}: {detail}")
+        
+        healthy = all(ok for _, ok, _ in checks)
+        print(f"\nRAG setup is {'healthy' if healthy else 'NOT healthy; run setup without --verify-only'}")
+        return healthy
+    
     def print_summary(self):
         """Print setup summary."""
         end_time = datetime.now()
-        duration = end_time - self.setup_start_time
+        duration_s = (time.perf_counter_ns() - self._start_ns) / 1e9
         
         print("\n" + "=" * 80)
         print("=� SETUP SUMMARY")
@@ -282,7 +534,7 @@ class RAGSetupManager:
         if 'vector_store_count' in self.setup_info:
             print(f"   =�  Vector store documents: {self.setup_info['vector_store_count']}")
         
-        print(f"\n�  Total time: {duration.total_seconds():.1f} seconds")
+        print(f"\n�  Total time: {duration_s:.1f} seconds")
         print(f"=� Completed: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
         
         # Next steps
@@ -299,15 +551,21 @@ class RAGSetupManager:
         """Run the complete setup pipeline."""
         self.print_header()
         
-        # Step 1: Load documents
-        if not self.step_1_load_documents():
-            self.print_summary()
-            return False
-        
-        # Step 2: Create vector store
-        if not self.step_2_create_vector_store():
-            self.print_summary()
-            return False
+        # Steps 1 and 2 overlap when documents have to be fetched, unless the store is kept
+        if self.force_reload or self._existing_documents_file() is None:
+            if not self.steps_1_2_pipelined():
+                self.print_summary()
+                return False
+        else:
+            # Step 1: Load documents
+            if not self.step_1_load_documents():
+                self.print_summary()
+                return False
+            
+            # Step 2: Create vector store
+            if not self.step_2_create_vector_store():
+                self.print_summary()
+                return False
         
         # Step 3: Test retriever
         if not self.step_3_test_retriever():
@@ -327,6 +585,7 @@ def main():
 Examples:
   python3 setup_rag.py                    # Standard setup
   python3 setup_rag.py --force-reload     # Force reload all data
+  python3 setup_rag.py --force-reload --fetch-concurrency 16 --split-workers 4
   python3 setup_rag.py --no-test          # Skip test queries
   python3 setup_rag.py --data-dir ./docs  # Custom data directory
         """
@@ -356,13 +615,78 @@ Examples:
         help='Force reload documents and recreate vector store'
     )
     
+    parser.add_argument(
+        '--fetch-concurrency',
+        type=int,
+        default=None,
+        help='Pages fetched concurrently while scraping (default: loader setting)'
+    )
+    
+    parser.add_argument(
+        '--split-workers',
+        type=int,
+        default=None,
+        help='Processes used to split documents into chunks (default: one per CPU core)'
+    )
+    
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=256,
+        help='Documents embedded and inserted per vector store call (default: 256)'
+    )
+    
     parser.add_argument(
         '--no-test',
         action='store_true',
         help='Skip test queries after setup'
     )
     
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Run test queries cold instead of reusing answers from earlier runs'
+    )
+    
+    parser.add_argument(
+        '--hnsw-m',
+        type=int,
+        default=16,
+        help='HNSW links per node when the collection is created (default: 16)'
+    )
+    
+    parser.add_argument(
+        '--hnsw-ef',
+        type=int,
+        default=100,
+        help='HNSW search candidate list size when the collection is created (default: 100)'
+    )
+    
+    parser.add_argument(
+        '--backend',
+        choices=['chroma', 'faiss'],
+        default='chroma',
+        help='Vector store backend (default: chroma)'
+    )
+    
+    parser.add_argument(
+        '--quantize',
+        action='store_true',
+        help='Store int8 quantized vectors, 4x smaller (requires --backend faiss)'
+    )
+    
+    parser.add_argument(
+        '--verify-only',
+        action='store_true',
+        help='Only check that documents, vector store and Ollama are in place (no model loads)'
+    )
+    
     args = parser.parse_args()
+    if args.quantize and args.backend != 'faiss':
+        parser.error('--quantize requires --backend faiss')
+    
+    # Show progress messages from the vector store and retriever
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
     # Create and run setup manager
     setup_manager = RAGSetupManager(
@@ -370,9 +694,20 @@ Examples:
         vector_store_dir=args.vector_store_dir,
         collection_name=args.collection_name,
         force_reload=args.force_reload,
-        test_queries=not args.no_test
+        test_queries=not args.no_test,
+        fetch_concurrency=args.fetch_concurrency,
+        split_workers=args.split_workers,
+        batch_size=args.batch_size,
+        use_answer_cache=not args.no_cache,
+        hnsw_m=args.hnsw_m,
+        hnsw_search_ef=args.hnsw_ef,
+        backend=args.backend,
+        quantize=args.quantize
     )
     
+    if args.verify_only:
+        sys.exit(0 if setup_manager.verify() else 1)
+    
     success = setup_manager.run_setup()
     
     # Exit with appropriate code
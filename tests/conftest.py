@@ -0,0 +1,39 @@
+import hashlib
+import os
+import sys
+
+# The RAG modules import each other by bare name (e.g. "from vector_store import ..."), so both the
+# repository root and rag/ go on the path, as rag_bridge.py and setup_rag.py arrange at runtime
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'rag'))
+
+import langchain_community.embeddings
+import numpy as np
+import pytest
+from chromadb.api.client import SharedSystemClient
+from langchain_core.embeddings import Embeddings
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic unit vectors, standing in for the sentence-transformers model."""
+    
+    def __init__(self, **kwargs):
+        pass
+    
+    def embed_query(self, text):
+        vector = np.frombuffer(hashlib.sha256(text.encode('utf-8')).digest(), dtype=np.uint8)[:16].astype(float)
+        return list(vector / np.linalg.norm(vector))
+    
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+@pytest.fixture
+def hash_embeddings(tmp_path, monkeypatch):
+    """Run in an empty directory with HMRCVectorStore embedding through HashEmbeddings."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(langchain_community.embeddings, 'HuggingFaceEmbeddings', HashEmbeddings)
+    yield
+    # Chroma keeps one client per path string, and tests reuse the relative ".chromadb"
+    SharedSystemClient.clear_system_cache()
@@ -0,0 +1,197 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from langchain.schema import Document
+
+from document_loader import (HMRCDocumentLoader, _PageCache, _RateLimiter, _fast_split, _fingerprint,
+                             _retry_after_seconds, iter_parquet_documents)
+
+MANUAL = 'https://www.gov.uk/hmrc-internal-manuals/employment-related-securities'
+
+
+def _manual_text(paragraphs=12):
+    return '\n\n'.join(
+        ' '.join(f'ersm{p}word{w}' for w in range(60)) + '\nShort line.'
+        for p in range(paragraphs)
+    )
+
+
+def test_fast_split_respects_chunk_size_and_overlaps():
+    text = _manual_text()
+    chunks = _fast_split(text)
+    
+    assert len(chunks) > 1
+    assert all(0 < len(chunk) <= 1000 for chunk in chunks)
+    assert all(chunk == chunk.strip() for chunk in chunks)
+    # Each chunk starts inside the previous one
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.split()[0] in previous.split()
+    # Every word of the text survives the split
+    assert set(text.split()) == {word for chunk in chunks for word in chunk.split()}
+
+
+def test_fast_split_drops_empty_and_hard_cuts_long_words():
+    assert _fast_split('') == []
+    assert _fast_split(' \n\n  ') == []
+    
+    chunks = _fast_split('x' * 2500)
+    assert all(0 < len(chunk) <= 1000 for chunk in chunks)
+    assert chunks[0] == 'x' * 1000
+
+
+def test_retry_after_seconds_parses_delta_and_date():
+    assert _retry_after_seconds('7') == 7.0
+    assert _retry_after_seconds('-3') == 0.0
+    assert _retry_after_seconds(None, default=4.0) == 4.0
+    assert _retry_after_seconds('soon', default=4.0) == 4.0
+    
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= _retry_after_seconds(later) <= 30
+    earlier = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=30), usegmt=True)
+    assert _retry_after_seconds(earlier) == 0.0
+
+
+def test_rate_limiter_allows_burst_then_spaces_requests():
+    limiter = _RateLimiter(rate=10, burst=2)
+    assert limiter._reserve() == 0.0
+    assert limiter._reserve() == 0.0
+    assert 0 < limiter._reserve() <= 0.1
+    
+    limiter.pause(5)
+    assert 4.9 < limiter._reserve() <= 5
+    
+    limiter = _RateLimiter(rate=1000)
+    
+    async def acquire_five():
+        await asyncio.gather(*(limiter.acquire_async() for _ in range(5)))
+    
+    asyncio.run(asyncio.wait_for(acquire_five(), 1))
+
+
+@pytest.mark.parametrize('url, expected', [
+    (f'{MANUAL}/ersm20000', f'{MANUAL}/ersm20000'),
+    ('http://www.gov.uk/hmrc-internal-manuals/employment-related-securities/ersm20000',
+     'http://www.gov.uk/hmrc-internal-manuals/employment-related-securities/ersm20000'),
+    (f'{MANUAL}/ersm20000?step=1#section-2', f'{MANUAL}/ersm20000#section-2'),
+    (f'{MANUAL}/ersm20000#main-content', None),
+    (f'{MANUAL}/ersm20000#content', None),
+    (f'{MANUAL}/annex.PDF', None),
+    ('https://www.gov.uk/hmrc-internal-manuals/capital-gains-manual/cg10000', None),
+    ('https://example.com/hmrc-internal-manuals/employment-related-securities', None),
+])
+def test_filter_and_clean(tmp_path, url, expected):
+    loader = HMRCDocumentLoader(data_dir=str(tmp_path))
+    assert loader._filter_and_clean(url) == expected
+
+
+def test_304_without_validators_keeps_stored_ones(tmp_path):
+    loader = HMRCDocumentLoader(data_dir=str(tmp_path), cache_max_age=0, requests_per_second=1000)
+    conditional_requests = []
+    
+    async def page(request):
+        if request.headers.get('If-None-Match') == '"v1"':
+            conditional_requests.append(request.headers['If-None-Match'])
+            return web.Response(status=304)  # No ETag / Last-Modified on the 304
+        return web.Response(text='<html><body>ERSM</body></html>', content_type='text/html', headers={'ETag': '"v1"'})
+    
+    async def fetch_three_times():
+        app = web.Application()
+        app.router.add_get('/page', page)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            url = str(server.make_url('/page'))
+            return url, [await loader._fetch_all([url]) for _ in range(3)]
+        finally:
+            await server.close()
+    
+    try:
+        url, results = loader._run(fetch_three_times())
+    finally:
+        loader.close()
+    
+    assert all(result[0][1] == '<html><body>ERSM</body></html>' for result in results)
+    assert conditional_requests == ['"v1"', '"v1"']
+    assert loader.page_cache.get(url)['etag'] == '"v1"'
+
+
+def test_crawled_pages_keep_only_parse_cache_key(tmp_path):
+    loader = HMRCDocumentLoader(data_dir=str(tmp_path))
+    url = 'https://www.gov.uk/hmrc-internal-manuals/employment-related-securities/ersm10000'
+    html = '<html><head><title>ERSM10000</title></head><body><h1>Introduction</h1><p>Text</p></body></html>'
+    doc, _ = loader._parse_page(url, html)
+    loader._crawled_pages[url] = _fingerprint(html.encode('utf-8'))
+    
+    rebuilt = loader._take_crawled_page(url)
+    
+    assert rebuilt.page_content == doc.page_content
+    assert rebuilt.metadata == doc.metadata
+    assert url not in loader._crawled_pages
+    assert loader._take_crawled_page(url) is None
+
+
+def test_saved_parquet_round_trips_documents(tmp_path):
+    loader = HMRCDocumentLoader(data_dir=str(tmp_path))
+    documents = [
+        Document(page_content='EMI', metadata={'source_url': f'{MANUAL}/ersm100000', 'discovery_depth': 1}),
+        Document(page_content='CSOP', metadata={'source_url': f'{MANUAL}/ersm110000', 'section': 'csop'}),
+    ]
+    path = loader.save_documents(documents, 'round_trip')
+    
+    # Keys a row never had come back absent rather than as None
+    assert list(iter_parquet_documents(path, batch_size=1)) == documents
+    assert loader.load_saved_documents('round_trip') == documents
+
+
+def test_split_workers_match_in_process_split(tmp_path):
+    documents = [Document(page_content=_manual_text(p + 1), metadata={'source_url': f'{MANUAL}/ersm{p}'})
+                 for p in range(40)]
+    
+    def chunks(split_workers):
+        loader = HMRCDocumentLoader(data_dir=str(tmp_path), split_workers=split_workers)
+        return [(chunk.page_content, chunk.metadata['source_url'], chunk.metadata['chunk_id'])
+                for chunk in loader.iter_chunks(documents)]
+    
+    assert chunks(2) == chunks(1)
+
+
+def test_page_cache_write_leaves_no_temporary_files(tmp_path):
+    cache = _PageCache(str(tmp_path), max_age=60)
+    cache.put(f'{MANUAL}/ersm10000', '<html>ERSM</html>', '"v1"', None)
+    
+    with pytest.raises(TypeError):
+        cache.put(f'{MANUAL}/ersm20000', object(), None, None)  # Not JSON-serializable
+    
+    assert cache.get(f'{MANUAL}/ersm10000')['html'] == '<html>ERSM</html>'
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_iter_documents_adds_page_metadata_and_skips_duplicates(tmp_path):
+    loader = HMRCDocumentLoader(data_dir=str(tmp_path), use_cache=False, requests_per_second=1000)
+    
+    async def page(request):
+        body = 'Same text' if request.match_info['code'] != 'ersm30000' else 'Other text'
+        return web.Response(text=f'<html><body><h1>{body}</h1></body></html>', content_type='text/html')
+    
+    app = web.Application()
+    app.router.add_get('/hmrc-internal-manuals/employment-related-securities/{code}', page)
+    server = TestServer(app)
+    loader._run(server.start_server())
+    try:
+        urls = [str(server.make_url(f'/hmrc-internal-manuals/employment-related-securities/{code}'))
+                for code in ('ersm10000', 'ersm20000', 'ersm30000')]
+        documents = list(loader.iter_documents(discover_links=False, url_list=urls))
+    finally:
+        loader._run(server.close())
+        loader.close()
+    
+    assert [doc.metadata['source_url'] for doc in documents] == [urls[0], urls[2]]
+    assert all(doc.metadata['document_type'] == 'hmrc_employment_securities' for doc in documents)
+    assert loader.documents_loaded == 2
+    assert loader.duplicate_pages == 1
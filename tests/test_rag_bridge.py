@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import threading
+
+import langchain_community.llms
+import pytest
+from langchain.schema import Document
+
+import rag_bridge
+import rag.retriever
+import vector_store
+
+
+class ChattyLLM:
+    """Ollama stand-in that, like a misbehaving dependency, prints to stdout."""
+    
+    def __init__(self, **kwargs):
+        pass
+    
+    def invoke(self, prompt, **kwargs):
+        print("llm progress")
+        return "EMI options are tax-advantaged."
+    
+    def stream(self, prompt, **kwargs):
+        for fragment in ("EMI options ", "are tax-advantaged."):
+            print("llm progress")
+            yield fragment
+
+
+DOCUMENTS = [
+    Document(page_content=f"ERSM{code} explains {topic}.",
+             metadata={'source_url': f'https://www.gov.uk/ersm{code}', 'section': f'ersm{code}'})
+    for code, topic in [(100000, 'EMI schemes'), (110000, 'CSOP'), (120000, 'SAYE')]
+]
+
+
+@pytest.fixture
+def bridge(hash_embeddings, monkeypatch):
+    """The bridge as the CLI builds it, on the real retriever and a real Chroma store."""
+    monkeypatch.setattr(langchain_community.llms, 'Ollama', ChattyLLM)
+    vector_store.HMRCVectorStore(embedding_cache_path=None).add_documents(DOCUMENTS)
+    
+    rag_bridge.get_bridge.cache_clear()
+    yield rag_bridge.get_bridge()
+    rag_bridge.get_bridge.cache_clear()
+
+
+def test_bridge_uses_the_full_retriever(bridge):
+    assert bridge.rag_available, getattr(bridge, 'error_message', None)
+    assert isinstance(bridge.retriever, rag.retriever.HMRCRetriever)
+    # Answering never writes document embeddings, so starting the bridge creates no cache
+    assert not os.path.exists('.embcache')
+
+
+def test_search_batch_returns_results_per_query(bridge, capsys):
+    result, exit_code = rag_bridge.handle_query("search_batch: EMI schemes | CSOP | SAYE")
+    
+    assert exit_code == 0 and result["rag_available"], result
+    assert result["queries"] == ["EMI schemes", "CSOP", "SAYE"]
+    assert [len(results) for results in result["results"]] == [3, 3, 3]
+    assert result["count"] == 9
+    
+    result, _ = rag_bridge.handle_query("search: EMI schemes")
+    assert result["count"] == 3
+    assert capsys.readouterr().out == ""
+
+
+def test_prints_go_to_stderr_and_responses_to_stdout(bridge, capsys, monkeypatch):
+    # main() does this once at startup; undone after the test
+    monkeypatch.setattr(sys, 'stdout', sys.stdout)
+    monkeypatch.setattr(rag_bridge, '_response_stream', rag_bridge._response_stream)
+    rag_bridge._reserve_stdout_for_responses()
+    
+    result, exit_code = rag_bridge.handle_query("What are EMI schemes?")
+    rag_bridge._emit(result, indent=False)
+    
+    assert exit_code == 0 and result["rag_available"], result
+    captured = capsys.readouterr()
+    assert json.loads(captured.out)["answer"].startswith("EMI options are tax-advantaged.")
+    assert "llm progress" in captured.err
+
+
+def test_stream_yields_deltas_then_full_response(bridge):
+    events = list(rag_bridge.handle_stream_query("What are EMI schemes?"))
+    
+    assert [event["delta"] for event in events[:-1]] == ["EMI options ", "are tax-advantaged."]
+    assert events[-1]["done"] and events[-1]["rag_available"], events[-1]
+    assert events[-1]["answer"].startswith("EMI options are tax-advantaged.")
+    assert len(events[-1]["sources"]) == 3
+
+
+class GatedLLM(ChattyLLM):
+    """Streams one fragment, then holds the generation open until released."""
+    
+    def __init__(self):
+        self.first_fragment_sent = threading.Event()
+        self.release = threading.Event()
+    
+    def stream(self, prompt, **kwargs):
+        yield "EMI options "
+        self.first_fragment_sent.set()
+        self.release.wait(10)
+        yield "are tax-advantaged."
+
+
+def test_questions_are_answered_while_a_stream_is_generating(bridge):
+    bridge.retriever.llm = llm = GatedLLM()
+    events = []
+    stream = threading.Thread(target=lambda: events.extend(rag_bridge.handle_stream_query("What are EMI schemes?")))
+    stream.start()
+    try:
+        assert llm.first_fragment_sent.wait(10)
+        
+        # The stream is blocked mid-generation; other requests must not queue behind it
+        answered = threading.Thread(target=rag_bridge.handle_query, args=("What is a CSOP?",))
+        answered.start()
+        answered.join(5)
+        assert not answered.is_alive()
+    finally:
+        llm.release.set()
+        stream.join(10)
+    
+    assert events[-1]["answer"].startswith("EMI options are tax-advantaged.")
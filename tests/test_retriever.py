@@ -0,0 +1,85 @@
+import numpy as np
+
+import retriever
+from retriever import SemanticAnswerCache
+
+
+def _unit(i, dim=4):
+    return np.eye(dim, dtype=np.float32)[i]
+
+
+def _clock(monkeypatch, start=1_000_000.0):
+    now = [start]
+    monkeypatch.setattr(retriever.time, 'time', lambda: now[0])
+    return now
+
+
+def _no_embed(question):
+    raise AssertionError('exact hits must not embed the question')
+
+
+def test_exact_and_semantic_hits():
+    cache = SemanticAnswerCache(max_size=4, threshold=0.9)
+    cache.put('What is an ERS?', _unit(0), {'answer': 'a'})
+    
+    response, _ = cache.lookup('  what is an ERS ', _no_embed)
+    assert response == {'answer': 'a'}
+    
+    response, _ = cache.lookup('Explain ERS', lambda q: _unit(0) * 0.99 + _unit(1) * 0.01)
+    assert response == {'answer': 'a'}
+    response, embedding = cache.lookup('Something else', lambda q: _unit(2))
+    assert response is None and embedding is not None
+    
+    assert cache.get_stats()['hits'] == 2
+    assert cache.get_stats()['semantic_hits'] == 1
+    assert cache.get_stats()['misses'] == 1
+
+
+def test_expired_answers_are_evicted(monkeypatch):
+    now = _clock(monkeypatch)
+    cache = SemanticAnswerCache(max_size=4, ttl=60)
+    cache.put('q', _unit(0), {'answer': 'a'})
+    
+    now[0] += 59
+    assert cache.lookup('q', _no_embed)[0] == {'answer': 'a'}
+    now[0] += 2
+    assert cache.lookup('q', lambda q: _unit(0))[0] is None
+    assert cache.get_stats()['size'] == 0
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_least_recently_used_answer_is_evicted():
+    cache = SemanticAnswerCache(max_size=2)
+    cache.put('q0', _unit(0), {'answer': 0})
+    cache.put('q1', _unit(1), {'answer': 1})
+    cache.lookup('q0', _no_embed)  # q1 is now least recently used
+    cache.put('q2', _unit(2), {'answer': 2})
+    
+    assert cache.lookup('q1', lambda q: _unit(1))[0] is None
+    assert cache.lookup('q0', _no_embed)[0] == {'answer': 0}
+    assert cache.lookup('q2', _no_embed)[0] == {'answer': 2}
+    assert cache.get_stats()['evictions'] == 1
+    
+    # The freed row is reused, and the evicted question's vector no longer matches
+    cache.put('q3', _unit(3), {'answer': 3})
+    assert cache.lookup('other', lambda q: _unit(1))[0] is None
+
+
+def test_answers_reload_from_sqlite(tmp_path, monkeypatch):
+    now = _clock(monkeypatch)
+    path = str(tmp_path / 'cache' / 'answers.sqlite')
+    cache = SemanticAnswerCache(max_size=4, ttl=60, path=path)
+    cache.put('old', _unit(0), {'answer': 'old'})
+    now[0] += 30
+    cache.put('new', _unit(1), {'answer': 'new', 'sources': [{'rank': 1}]})
+    
+    now[0] += 40  # 'old' has expired, 'new' is still fresh
+    reloaded = SemanticAnswerCache(max_size=4, ttl=60, path=path)
+    
+    assert reloaded.get_stats()['size'] == 1
+    assert reloaded.lookup('new', _no_embed)[0] == {'answer': 'new', 'sources': [{'rank': 1}]}
+    assert reloaded.lookup('similar to new', lambda q: _unit(1))[0] is not None
+    assert reloaded.lookup('old', lambda q: _unit(0))[0] is None
+    
+    reloaded.clear()
+    assert SemanticAnswerCache(max_size=4, ttl=60, path=path).get_stats()['size'] == 0
@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+
+from vector_store import EmbeddingCache, HMRCVectorStore, _FAISSIndex
+
+
+def _unit_rows(rows):
+    rows = np.asarray(rows, dtype=np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_quantized_faiss_index_keeps_range_for_later_batches(tmp_path):
+    rng = np.random.default_rng(0)
+    index = _FAISSIndex(str(tmp_path), 'quantized', quantize=True)
+    
+    # The first batch spans only a sliver of each dimension's range
+    first = _unit_rows(np.eye(32)[0] + 0.01 * rng.standard_normal((8, 32)))
+    later = _unit_rows(rng.standard_normal((200, 32)))
+    index.add([Document(page_content=f'first {i}') for i in range(len(first))], first.tolist())
+    index.add([Document(page_content=f'later {i}') for i in range(len(later))], later.tolist())
+    
+    results = index.search(later.tolist(), k=1)
+    
+    assert [hits[0][0].page_content for hits in results] == [f'later {i}' for i in range(len(later))]
+    assert all(abs(hits[0][1]) < 0.05 for hits in results)
+
+
+def test_embedding_cache_is_created_only_when_documents_are_embedded(hash_embeddings):
+    store = HMRCVectorStore()
+    store.similarity_search_with_scores('EMI', k=1)
+    assert not os.path.exists('.embcache')
+    
+    store.add_documents([Document(page_content='EMI'), Document(page_content='CSOP')])
+    assert os.path.exists(os.path.join('.embcache', 'embeddings.sqlite'))
+    assert store.embedding_cache.get_many('all-MiniLM-L6-v2', [EmbeddingCache.content_hash('EMI')])